@@ -0,0 +1,348 @@
+"""
+Benchmark Script - Đo hiệu năng pipeline camera
+Chạy: python benchmark.py <benchmark> [options]
+"""
+
+import argparse
+import time
+
+import cv2
+
+
+def read_frames(video_path, max_frames):
+    """Đọc trước tối đa max_frames frame để benchmark không phụ thuộc decode"""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+# ==============================
+# Bag counter: single-frame vs batched multi-stream
+# ==============================
+def bench_bag_batch(args):
+    import numpy as np
+    from src.core import bag_counter
+    from src.core.model_registry import resolve_model
+
+    videos = args.videos * (args.streams // len(args.videos) + 1)
+    videos = videos[:args.streams]
+    clips = [read_frames(v, args.frames) for v in videos]
+    steps = min(len(c) for c in clips)
+    if steps == 0:
+        print("ERROR: No frames to benchmark")
+        return
+
+    print(f"Streams: {len(clips)} | Frames per stream: {steps}")
+
+    # Same weights and backend (resolved by the registry) on both paths,
+    # each warmed up on a blank frame so predictor/tracker setup is not timed
+    device = bag_counter.get_device()
+    half = device == 'cuda'
+    blank = np.zeros_like(clips[0][0])
+    print(f"Backend: {resolve_model(bag_counter.MODEL_PATH, device)[1]} | Device: {device}")
+
+    # Current loop: one model.track call per frame per camera
+    models = [bag_counter.create_bag_model() for _ in clips]
+    for m in models:
+        m.track(blank, imgsz=640, conf=0.25, iou=0.5, device=device, half=half, verbose=False, persist=True)
+    start = time.perf_counter()
+    for step in range(steps):
+        for m, clip in zip(models, clips):
+            m.track(clip[step], imgsz=640, conf=0.25, iou=0.5,
+                    device=device, half=half, verbose=False, persist=True)
+    single_fps = steps * len(clips) / (time.perf_counter() - start)
+
+    # Batched: one model call per step, one tracker per camera
+    model = bag_counter.create_bag_model()
+    bag_counter.track_batch(model, [blank] * len(clips), [bag_counter.create_tracker() for _ in clips])
+    trackers = [bag_counter.create_tracker() for _ in clips]
+    start = time.perf_counter()
+    for step in range(steps):
+        bag_counter.track_batch(model, [clip[step] for clip in clips], trackers)
+    batch_fps = steps * len(clips) / (time.perf_counter() - start)
+
+    print(f"Single-frame loop : {single_fps:7.1f} frames/s")
+    print(f"Batched ({len(clips)} streams): {batch_fps:7.1f} frames/s")
+    print(f"Speedup           : {batch_fps / single_fps:7.2f}x")
+
+
+# ==============================
+# Bag counter: full-frame vs ROI-cropped inference
+# ==============================
+def bench_bag_crop(args):
+    import numpy as np
+    from ultralytics import YOLO
+    from src.core import bag_counter
+
+    frames = read_frames(args.videos[0], args.frames)
+    if not frames:
+        print("ERROR: No frames to benchmark")
+        return
+
+    h, w = frames[0].shape[:2]
+    x0, y0, x1, y1 = bag_counter.rois.bounding_rect((h, w), args.padding)
+    print(f"Frames: {len(frames)} | Full: {w}x{h} | Crop: {x1 - x0}x{y1 - y0}")
+
+    timings = {}
+    for mode in ("full-frame", "ROI-cropped"):
+        m = YOLO(bag_counter.MODEL_PATH)
+        start = time.perf_counter()
+        for frame in frames:
+            source = frame if mode == "full-frame" else np.ascontiguousarray(frame[y0:y1, x0:x1])
+            m.track(source, imgsz=640, conf=0.25, iou=0.5, device=bag_counter.get_device(),
+                    verbose=False, persist=True)
+        timings[mode] = len(frames) / (time.perf_counter() - start)
+        print(f"{mode:12s}: {timings[mode]:7.1f} FPS")
+
+    print(f"FPS gained  : {timings['ROI-cropped'] - timings['full-frame']:+7.1f} "
+          f"({timings['ROI-cropped'] / timings['full-frame']:.2f}x)")
+
+
+# ==============================
+# Detector backends: per-frame latency on the same video
+# ==============================
+def bench_backends(args):
+    import numpy as np
+    from src.core.detector_backend import BACKENDS, backend_available
+    from src.core.model_registry import get_model, get_device
+
+    weights = {
+        "bag": "runs/detect/ice_tracker/weights/best.pt",
+        "plate": "model/best.pt",
+    }[args.model]
+    frames = read_frames(args.videos[0], args.frames)
+    if not frames:
+        print("ERROR: No frames to benchmark")
+        return
+
+    device = get_device()
+    print(f"Model: {weights} | Frames: {len(frames)} | Device: {device}")
+    for backend in BACKENDS:
+        if not backend_available(backend):
+            print(f"{backend:9s}: not installed")
+            continue
+        model = get_model(weights, device=device, backend=backend)
+        latencies = []
+        for frame in frames:
+            start = time.perf_counter()
+            model.predict(frame, imgsz=640, conf=0.25, device=device, verbose=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies = np.array(latencies)
+        print(f"{backend:9s}: mean {latencies.mean():6.1f} ms | p50 {np.percentile(latencies, 50):6.1f} ms"
+              f" | p95 {np.percentile(latencies, 95):6.1f} ms | {1000 / latencies.mean():6.1f} FPS")
+
+
+# ==============================
+# Motion gate: skipped frames + CPU saved on data/video
+# ==============================
+def bench_motion_gate(args):
+    from pathlib import Path
+    from src.core.motion_gate import MotionGate
+    from src.core.model_registry import get_model, get_device
+
+    videos = sorted(Path("data/video").rglob("*.mp4"))
+    if not videos:
+        print("ERROR: No videos under data/video")
+        return
+
+    device = get_device()
+    for video in videos:
+        weights = "model/best.pt" if "LicensePlate" in video.parts else "runs/detect/ice_tracker/weights/best.pt"
+        model = get_model(weights, device=device)
+        frames = read_frames(str(video), args.frames)
+        if not frames:
+            continue
+
+        start = time.process_time()
+        for frame in frames:
+            model.predict(frame, imgsz=640, device=device, verbose=False)
+        cpu_full = time.process_time() - start
+
+        gate = MotionGate()
+        start = time.process_time()
+        for frame in frames:
+            if gate.should_infer(frame):
+                model.predict(frame, imgsz=640, device=device, verbose=False)
+        cpu_gated = time.process_time() - start
+
+        stats = gate.stats()
+        print(f"{video}: skipped {stats['skip_ratio']:.0%} of {stats['frames']} frames | "
+              f"CPU {cpu_full:.1f}s -> {cpu_gated:.1f}s "
+              f"(saved {1 - cpu_gated / cpu_full:.0%}) | gate {stats['gate_ms_per_frame']:.2f} ms/frame")
+
+
+# ==============================
+# Plate OCR: readtext vs recognition-only (single + batched)
+# ==============================
+def plate_crops(video_path, max_frames):
+    """Plate crops found by the plate detector in the first max_frames frames"""
+    from src.core.model_registry import get_model, get_device
+
+    model = get_model("model/best.pt", device=get_device())
+    crops = []
+    for frame in read_frames(video_path, max_frames):
+        result = model.predict(frame, imgsz=640, conf=0.4, device=get_device(), verbose=False)[0]
+        for x1, y1, x2, y2 in result.boxes.xyxy.cpu().numpy().astype(int):
+            crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+            if crop.size:
+                crops.append(crop.copy())
+    return crops
+
+
+def bench_ocr(args):
+    from src.core.model_registry import get_ocr_reader
+    from src.core.plate_ocr import PlateRecognizer, readtext_best
+    from src.core.plate_tracker import clean_plate_text
+
+    crops = plate_crops(args.videos[0], args.frames)
+    if not crops:
+        print("ERROR: No plate crops to benchmark")
+        return
+
+    reader = get_ocr_reader()
+    recognizer = PlateRecognizer(reader)
+    recognizer.read(crops[0])  # warm-up
+    print(f"Plate crops: {len(crops)} | Batch size: {args.batch}")
+
+    timings, reads = {}, {}
+    start = time.perf_counter()
+    reads["readtext"] = [readtext_best(reader, crop) for crop in crops]
+    timings["readtext"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reads["recognize"] = [recognizer.read(crop) for crop in crops]
+    timings["recognize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reads["recognize-batch"] = [read for i in range(0, len(crops), args.batch)
+                                for read in recognizer.read_batch(crops[i:i + args.batch])]
+    timings["recognize-batch"] = time.perf_counter() - start
+
+    baseline = [clean_plate_text(text or "") for text, _ in reads["readtext"]]
+    for mode, elapsed in timings.items():
+        same = sum(clean_plate_text(text or "") == b for (text, _), b in zip(reads[mode], baseline))
+        print(f"{mode:16s}: {1000 * elapsed / len(crops):6.1f} ms/crop | "
+              f"{timings['readtext'] / elapsed:5.2f}x | same text as readtext {same}/{len(crops)}")
+
+
+# ==============================
+# Dashboard DataFrame: dict rows vs typed columnar builder
+# ==============================
+def synthetic_plates(records, days, plates=2000, seed=0):
+    """{date: {plate_key: record}} with `records` records spread over `days` days"""
+    import random
+    from datetime import datetime, timedelta
+
+    rng = random.Random(seed)
+    names = [f"{rng.randint(10, 99)}{rng.choice('ABCDEFGHKLMNPSTUVXYZ')}-{rng.randint(10000, 99999)}"
+             for _ in range(plates)]
+    today = datetime.now()
+    data = {}
+    for i in range(records):
+        date = (today - timedelta(days=i % days)).strftime("%Y-%m-%d")
+        data.setdefault(date, {})[f"record_{i}"] = {
+            "plate": rng.choice(names),
+            "bag": rng.randint(0, 200),
+            "timestamp": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+        }
+    return data
+
+
+def dict_rows_frame(raw_data):
+    """The previous dashboard conversion: one dict per row, untyped object columns"""
+    import pandas as pd
+
+    rows = []
+    for date, plates_data in raw_data.items():
+        if isinstance(plates_data, dict):
+            for plate_info in plates_data.values():
+                if isinstance(plate_info, dict):
+                    rows.append({
+                        'Ngày': date,
+                        'Biển Số': plate_info.get('plate', 'N/A'),
+                        'Số Bao': plate_info.get('bag', 0),
+                        'Thời Gian': plate_info.get('timestamp', 'N/A'),
+                    })
+    return pd.DataFrame(rows) if rows else pd.DataFrame()
+
+
+def bench_dataframe(args):
+    from src.core.dashboard_data import PlateFrameBuilder
+
+    data = synthetic_plates(args.records, args.days)
+    latest = max(data)
+    print(f"Records: {args.records} | Days: {len(data)}")
+
+    def timed(fn, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        return result, best
+
+    def queries(df):
+        df.groupby('Biển Số', observed=True)['Số Bao'].sum().sort_values(ascending=False).head(10)
+        df.groupby('Ngày')['Số Bao'].sum()
+        df['Biển Số'].nunique()
+        df[df['Biển Số'].str.contains("5A", case=False, na=False)]
+
+    builder = PlateFrameBuilder()
+
+    def build_all():
+        for date, plates in data.items():
+            builder.update_day(date, plates)
+        return builder.frame()
+
+    def append_latest():
+        builder.update_day(latest, data[latest])
+        return builder.frame()
+
+    old, old_build = timed(lambda: dict_rows_frame(data))
+    new, new_build = timed(build_all)
+    # one more record on the latest day: only that day is converted again
+    data[latest]["record_new"] = {"plate": "65C-06855", "bag": 1, "timestamp": "23:59:59"}
+    _, append = timed(append_latest)
+    _, old_queries = timed(lambda: queries(old))
+    _, new_queries = timed(lambda: queries(new))
+
+    mb = lambda df: df.memory_usage(deep=True).sum() / 2 ** 20
+    print(f"dict rows : build {1000 * old_build:7.1f} ms | queries {1000 * old_queries:6.1f} ms | {mb(old):6.1f} MB")
+    print(f"columnar  : build {1000 * new_build:7.1f} ms | queries {1000 * new_queries:6.1f} ms | {mb(new):6.1f} MB")
+    print(f"append day: {1000 * append:7.1f} ms ({old_build / append:.1f}x faster than a full dict-rows rebuild)")
+    print("dtypes    : " + ", ".join(f"{name} {dtype}" for name, dtype in new.dtypes.items()))
+
+
+BENCHMARKS = {
+    "bag-batch": bench_bag_batch,
+    "bag-crop": bench_bag_crop,
+    "backends": bench_backends,
+    "dataframe": bench_dataframe,
+    "motion-gate": bench_motion_gate,
+    "ocr": bench_ocr,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Ice Tracker benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--videos", nargs="+", default=["data/video/Day/nuoc_da_bao1_ngay.mp4"])
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--model", choices=["bag", "plate"], default="bag")
+    parser.add_argument("--padding", type=int, default=64, help="ROI crop padding (px)")
+    parser.add_argument("--batch", type=int, default=4, help="crops per batched OCR call")
+    parser.add_argument("--records", type=int, default=100_000, help="synthetic license plate records")
+    parser.add_argument("--days", type=int, default=30, help="days the synthetic records span")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import os
 from pathlib import Path
 
 # ==================== PATHS ====================
-BASE_DIR = Path(__file__).parent.parent.parent  # smartIceTracker root
+BASE_DIR = Path(__file__).resolve().parent.parent  # smartIceTracker root
 SRC_DIR = BASE_DIR / "src"
 DATA_DIR = BASE_DIR / "data"
 MODEL_DIR = BASE_DIR / "model"
@@ -22,9 +22,32 @@ VIDEO_BAG_COUNTER = DATA_DIR / "video" / "Day" / "ice_tracker_video.mp4"
 MODEL_YOLO_LICENSE = MODEL_DIR / "best.pt"
 MODEL_YOLO_DETECTION = MODEL_DIR / "best.pt"
 
+# Bag counter weights: .pt, or an exported .onnx / *_openvino_model
+# (train.py writes export_report.json with the recommended variant)
+BAG_MODEL_PATH = os.getenv("BAG_MODEL_PATH", "runs/detect/ice_tracker/weights/best.pt")
+
+# Detector backend: "auto", "torch", "onnx" or "openvino"
+# (auto = PyTorch on GPU, OpenVINO/ONNX Runtime on CPU if installed)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto")
+
+# Storage backend: "firebase" (Realtime Database), "sqlite" (local file,
+# shared by pipeline and UI processes; the dashboards poll PRAGMA data_version
+# for the pipeline's writes) or "memory" (in-process, not persisted)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firebase")
+STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "data/local_db.sqlite")
+
 # Firebase
 FIREBASE_KEY = BASE_DIR / "firebase-key.json"
 FIREBASE_DB_URL = "https://smarticetracker-default-rtdb.asia-southeast1.firebasedatabase.app/"
+# Bag count writes are coalesced (latest value per path) and sent as one
+# multi-path update every interval, or sooner once this many paths are pending
+FIREBASE_FLUSH_INTERVAL = 0.5  # seconds
+FIREBASE_FLUSH_MAX_KEYS = 100
+# Local write-ahead log (firebase backend): writes survive network drops and restarts, and are
+# sent in batches of FIREBASE_OUTBOX_BATCH updates. Each update is applied exactly once, using
+# receipts under outbox_receipts/<day>/ (check: pytest tests/test_outbox.py)
+FIREBASE_OUTBOX = os.getenv("FIREBASE_OUTBOX", "data/firebase_outbox.db")
+FIREBASE_OUTBOX_BATCH = 200
 
 # ==================== STREAMLIT ====================
 STREAMLIT_PORT = 8501
@@ -42,6 +65,30 @@ DISPLAY_WIDTH = 1280
 # FPS target
 TARGET_FPS = 30
 
+# Skip detection on static frames (motion gate); forced pass every 30 frames
+MOTION_GATE = True
+
+# License plate OCR worker processes (EasyOCR holds the GIL on CPU)
+OCR_WORKERS = 2
+# "recognize": recognition only on the YOLO crop (no EasyOCR text detector)
+# "readtext": full EasyOCR pass
+OCR_MODE = os.getenv("OCR_MODE", "recognize")
+
+# OCR reads per tracked plate, combined by confidence-weighted voting
+PLATE_OCR_READS = 3
+# Best-quality crops buffered per tracked plate; only these are OCR'd
+PLATE_CROP_TOP_K = 3
+# Reads within this edit distance of the current plate collapse into it; a plate
+# seen again within the window reuses its record instead of counting a new truck
+PLATE_MAX_EDIT_DISTANCE = 1
+PLATE_DEDUP_WINDOW = 300.0  # seconds
+
+# Annotated preview frames per second (0 = annotate every processed frame)
+PREVIEW_FPS = 15
+
+# Bag counter: seconds after a track ID stops appearing before it is forgotten
+TRACK_STATE_TTL = 30.0
+
 # ==================== DATABASE ====================
 MAX_RETRIES = 3
 TIMEOUT = 10  # seconds
@@ -2,13 +2,20 @@
 Smart Ice Tracker - Main Package
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Smart Ice Tracker Team"
 
-# Package imports
-from . import core
-from . import ui
-from . import utils
+# Package imports (lazy: src.ui kéo theo Streamlit, src.core kéo theo model)
+_SUBPACKAGES = ('core', 'ui', 'utils')
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'core',
@@ -1,23 +1,41 @@
 """
 Smart Ice Tracker - Core Package
 Module xử lý camera, YOLO, Firebase
+
+Các module được import khi dùng lần đầu (lazy), nên import src.core
+không phải load model hay kết nối Firebase.
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Smart Ice Tracker Team"
 
-# Import chính để dễ access
-try:
-    from .license_plate import run_license_plate
-    from .bag_counter import run_bag_counter
-    from .firebase_handler import save_license_plate_and_bag
-    from .camera_manager import main as run_camera_main
-except ImportError as e:
-    print(f"⚠️ Import error in src.core: {e}")
-
-__all__ = [
-    'run_license_plate',
-    'run_bag_counter',
-    'save_license_plate_and_bag',
-    'run_camera_main',
-]
+# Tên public -> (module, thuộc tính)
+_EXPORTS = {
+    'run_license_plate': ('.license_plate', 'run_license_plate'),
+    'run_bag_counter': ('.bag_counter', 'run_bag_counter'),
+    'run_multi_bag_counter': ('.bag_counter', 'run_multi_bag_counter'),
+    'save_license_plate_and_bag': ('.firebase_handler', 'save_license_plate_and_bag'),
+    'run_camera_main': ('.camera_manager', 'main'),
+    'get_model': ('.model_registry', 'get_model'),
+    'create_model': ('.model_registry', 'create_model'),
+    'get_ocr_reader': ('.model_registry', 'get_ocr_reader'),
+    'load_report': ('.model_registry', 'load_report'),
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _EXPORTS[name]
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except (ImportError, AttributeError) as e:
+        print(f"⚠️ Import error in src.core: {e}")
+        raise
+    globals()[name] = value
+    return value
+
+
+__all__ = list(_EXPORTS)
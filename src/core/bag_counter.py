@@ -22,124 +22,438 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
 import numpy as np
 import cv2
-from ultralytics import YOLO
 import torch
 import threading
-import queue
+import time
 from datetime import datetime
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import IterableSimpleNamespace, yaml_load
+from ultralytics.utils.checks import check_yaml
 
-from src.core.firebase_handler import save_license_plate_and_bag
+from src.core.firebase_handler import bag_writer, queue_bag_count
+from src.utils.camera_helper import open_frame_source, PreviewGate, get_overlay_renderer
+from src.core.roi import RoiSet, box_centroids, draw_centroids
+from src.core.track_state import TrackStateStore
+from src.core.motion_gate import MotionGate
+from src.core.scheduler import FrameScheduler
+from ultralytics.engine.results import Results
+from src.core.model_registry import create_model, get_device
+from config.settings import BAG_MODEL_PATH, MOTION_GATE, PREVIEW_FPS, TARGET_FPS, TRACK_STATE_TTL
 
-def setup_device():
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"Device: {device}")
-    return device
+MODEL_PATH = BAG_MODEL_PATH
 
-device = setup_device()
 
-# Load YOLO model
-print("Loading bag counter model...")
-model = YOLO('runs/detect/ice_tracker/weights/best.pt')
+def create_bag_model():
+    """Bag detector of its own (predictor + tracker) for one pipeline, warmed up"""
+    return create_model(MODEL_PATH, device=get_device())
+
 
 # ROI configuration
 region_points = np.array([[494, 335], [451, 709], [590, 677], [630, 363]], np.int32)
 region_points = region_points.reshape((-1, 1, 2))
 
+# Named ROIs for this camera (all tested in the same vectorized pass)
+regions = {"bay": region_points}
+rois = RoiSet(regions)
+
 # State variables
 alpha = 0.8
-local_bag_count = 0
-counted_ids = set()
-firebase_queue = queue.Queue()
-firebase_worker_stop = threading.Event()
-
-def firebase_worker():
-    while not firebase_worker_stop.is_set():
-        try:
-            bag_val = firebase_queue.get(timeout=0.5)
-            try:
-                save_license_plate_and_bag(plate_text=None, bag_count=bag_val)
-            except Exception as e:
-                logging.debug(f"Firebase bag update error: {e}")
-            firebase_queue.task_done()
-        except queue.Empty:
+_firebase_users = 0
+_firebase_lock = threading.Lock()
+
+
+def acquire_firebase_worker():
+    """Start the shared coalescing Firebase writer for the first running counter"""
+    global _firebase_users
+    with _firebase_lock:
+        _firebase_users += 1
+        bag_writer.start()
+
+
+def release_firebase_worker():
+    """Flush and stop the shared Firebase writer once the last counter has finished"""
+    global _firebase_users
+    with _firebase_lock:
+        _firebase_users = max(_firebase_users - 1, 0)
+        if _firebase_users == 0:
+            bag_writer.stop()
+            stats = bag_writer.stats()
+            print(f"Firebase writer: {stats['puts']} writes in {stats['flushes']} updates "
+                  f"({stats['writes_saved']} saved), flush avg {stats['flush_ms_avg']:.0f} ms "
+                  f"/ max {stats['flush_ms_max']:.0f} ms, {stats['failed_flushes']} failed")
+
+# ===========================
+# Counting helpers
+# ===========================
+def create_tracker(tracker_cfg="botsort.yaml", frame_rate=30):
+    """Create a standalone tracker (same config as model.track default)"""
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_cfg)))
+    return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate)
+
+
+def track_batch(model, frames, trackers):
+    """
+    Run one batched YOLO pass over frames from several cameras,
+    then update each camera's own tracker with its detections.
+    """
+    results = model.predict(
+        frames,
+        imgsz=640,
+        conf=0.25,
+        iou=0.5,
+        device=get_device(),
+        half=get_device() == 'cuda',
+        verbose=False
+    )
+
+    for i, (result, tracker) in enumerate(zip(results, trackers)):
+        det = result.boxes.cpu().numpy()
+        tracks = tracker.update(det, frames[i])
+        if len(tracks) == 0:
             continue
+        idx = tracks[:, -1].astype(int)
+        results[i] = result[idx]
+        results[i].update(boxes=torch.as_tensor(tracks[:, :-1]))
+
+    return results
+
+
+def new_count_state(roi_set, ttl=TRACK_STATE_TTL):
+    """Empty per-ROI state: counted track IDs (time-evicting store) and counts"""
+    counted_ids = {name: TrackStateStore(ttl=ttl) for name in roi_set.names}
+    roi_counts = {name: 0 for name in roi_set.names}
+    return counted_ids, roi_counts
+
+
+def count_new_ids(ids, inside, roi_set, counted_ids, roi_counts):
+    """
+    Update per-ROI counts from a whole frame of tracks at once.
+    inside is the (n_tracks, n_rois) membership matrix from RoiSet.
+    Returns the number of newly counted IDs.
+    """
+    added = 0
+    for j, name in enumerate(roi_set.names):
+        store = counted_ids[name]
+        store.touch(ids)
+        new_ids = ids[inside[:, j] & ~store.contains_many(ids)]
+        if len(new_ids):
+            store.add_many(new_ids)
+            roi_counts[name] += len(new_ids)
+            added += len(new_ids)
+        store.evict()
+    return added
+
+
+def render_bag_frame(result, roi_set, centroids, roi_counts, frame=None, crop_rect=None):
+    """Draw detections, ROI tint, centroids and counts on a full-frame image"""
+    if crop_rect is None:
+        annotated_frame = result.plot()
+    else:
+        x0, y0, x1, y1 = crop_rect
+        annotated_frame = frame.copy()
+        annotated_frame[y0:y1, x0:x1] = result.plot()
+
+    get_overlay_renderer((128, 0, 128), alpha).blend_polygons(annotated_frame, roi_set.polygons)
+    cv2.polylines(annotated_frame, roi_set.polygons, isClosed=True, color=(0, 0, 255), thickness=2)
+
+    if centroids is not None:
+        draw_centroids(annotated_frame, centroids)
+
+    bag_count = sum(roi_counts.values())
+    cv2.putText(annotated_frame, f"Count: {bag_count}", (50, 50),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+    if len(roi_set) > 1:
+        for i, name in enumerate(roi_set.names):
+            cv2.putText(annotated_frame, f"{name}: {roi_counts[name]}", (50, 90 + 30 * i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+
+    return annotated_frame
+
+
+def annotate_and_count(result, roi_set, counted_ids, roi_counts, label="Bags counted",
+                       frame=None, crop_rect=None, render=True, source="bag_counter"):
+    """
+    Count new track IDs entering any ROI, then draw the preview frame.
+    New counts are queued for the current plate under source (one name
+    per camera, so the per-truck baselines stay separate).
+    When the result comes from a cropped frame, pass the full frame and
+    crop_rect so boxes and annotations are mapped back to full-frame space.
+    With render=False only counting runs and the frame is None.
+    """
+    if crop_rect is None:
+        offset = np.zeros(2, np.int32)
+        shape = result.orig_shape
+    else:
+        offset = np.array(crop_rect[:2], np.int32)
+        shape = frame.shape
+
+    centroids = None
+    if result.boxes is not None and result.boxes.id is not None:
+        ids = result.boxes.id.cpu().numpy().astype(np.int64)
+        centroids = box_centroids(result.boxes.xyxy.cpu().numpy()) + offset
+
+        inside = roi_set.membership(centroids, shape)
+        if count_new_ids(ids, inside, roi_set, counted_ids, roi_counts):
+            print(f"{label}: {sum(roi_counts.values())}")
+            queue_bag_count(sum(roi_counts.values()), source)
+
+    bag_count = sum(roi_counts.values())
+    if not render:
+        return None, bag_count
+    return render_bag_frame(result, roi_set, centroids, roi_counts, frame, crop_rect), bag_count
+
+
+def empty_result(image, names):
+    """Result with no detections, used for frames skipped by the motion gate (names: model.names)"""
+    return Results(image, path="", names=names)
+
+
+def near_roi(result, roi_set, shape, crop_rect=None, padding=64):
+    """Any detection (tracked or not) close to the ROIs -> process at full rate"""
+    if result.boxes is None or len(result.boxes) == 0:
+        return False
+    centroids = box_centroids(result.boxes.xyxy.cpu().numpy())
+    if crop_rect is not None:
+        centroids += np.array(crop_rect[:2], np.int32)
+    return roi_set.near(centroids, shape, padding)
+
+
+def _print_gate_stats(name, gate):
+    if gate is None:
+        return
+    stats = gate.stats()
+    print(f"{name} motion gate: skipped {stats['skipped']}/{stats['frames']} frames "
+          f"({stats['skip_ratio']:.0%}), {stats['gate_ms_per_frame']:.2f} ms/frame")
+
+
+def _print_scheduler_stats(name, scheduler):
+    stats = scheduler.stats()
+    print(f"{name} scheduler: processed {stats['processed']}/{stats['frames']} frames, "
+          f"stride {stats['stride']}, {stats['achieved_fps']:.1f} FPS, cost {stats['cost_ms']:.0f} ms")
+
+
+def _print_track_stats(name, counted_ids):
+    for roi_name, store in counted_ids.items():
+        stats = store.stats()
+        print(f"{name} track state [{roi_name}]: {stats['size']} IDs "
+              f"(peak {stats['peak_size']}, evicted {stats['evicted']})")
+
+
+def _print_capture_stats(name, cap):
+    stats = cap.stats()
+    print(f"{name} capture: {stats['captured']} frames, {stats['dropped']} dropped, "
+          f"latency avg {stats['latency_avg_ms']:.0f} ms / max {stats['latency_max_ms']:.0f} ms")
 
-firebase_thread = threading.Thread(target=firebase_worker, daemon=True)
-firebase_thread.start()
 
 # ===========================
 # Bag Counter Main Function
 # ===========================
-def run_bag_counter(video_path, frame_queue=None, stop_event=None):
-    global local_bag_count
-    cap = cv2.VideoCapture(video_path)
+def run_bag_counter(video_path, frame_queue=None, stop_event=None, threaded_capture=None,
+                    roi_set=None, crop_to_roi=False, roi_padding=64,
+                    preview_fps=PREVIEW_FPS, display_active=None, motion_gate=MOTION_GATE,
+                    target_fps=TARGET_FPS):
+    """
+    crop_to_roi: run detection/tracking only on a padded rectangle around
+    the ROIs; boxes are mapped back to full-frame space for counting.
+    motion_gate: skip detection (and tracker updates) on static frames.
+    target_fps: adaptive frame stride (FrameScheduler) that keeps up with
+    the source; full rate while something is near the ROI.
+    Annotation only runs when a preview consumer exists (frame_queue, and
+    display_active set if given) and at most preview_fps times per second;
+    frame_queue=None is fully headless.
+    Returns the final bag count.
+    """
+    preview = PreviewGate(frame_queue, preview_fps, display_active)
+    roi_set = roi_set or rois
+    counted_ids, roi_counts = new_count_state(roi_set)
+    local_bag_count = 0
+    cap = open_frame_source(video_path, threaded=threaded_capture)
     if not cap.isOpened():
         print(f"ERROR: Cannot open video: {video_path}")
-        return
+        return local_bag_count
 
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
+    crop_rect = roi_set.bounding_rect((height, width), roi_padding) if crop_to_roi else None
+    if crop_rect:
+        x0, y0, x1, y1 = crop_rect
+        print(f"ROI-cropped inference: {x1 - x0}x{y1 - y0} of {width}x{height}")
+
+    gate = MotionGate() if motion_gate else None
+    scheduler = FrameScheduler(cap.get(cv2.CAP_PROP_FPS), target_fps,
+                               cost_stride=not cap.drops_frames)
+    model = create_bag_model()
+    names = model.names
     print("Starting bag counter...")
+    acquire_firebase_worker()
+    processed = 0
+    start_time = time.time()
 
     try:
         while cap.isOpened():
             if stop_event and stop_event.is_set():
                 break
 
-            ret, frame = cap.read()
+            ret, frame, captured_at = cap.read()
             if not ret:
                 break
+            if not scheduler.should_process():
+                continue
+            step_start = time.perf_counter()
+
+            if crop_rect:
+                x0, y0, x1, y1 = crop_rect
+                source = np.ascontiguousarray(frame[y0:y1, x0:x1])
+            else:
+                source = frame
 
-            results = model.track(
-                frame,
-                imgsz=640,
-                conf=0.25,
-                iou=0.5,
-                device=device,
-                half=True,
-                verbose=False,
-                persist=True
+            if gate is None or gate.should_infer(source):
+                results = model.track(
+                    source,
+                    imgsz=640,
+                    conf=0.25,
+                    iou=0.5,
+                    device=get_device(),
+                    half=get_device() == 'cuda',
+                    verbose=False,
+                    persist=True
+                )
+            else:
+                results = [empty_result(source, names)]
+
+            render = preview.due()
+            annotated_frame, local_bag_count = annotate_and_count(
+                results[0], roi_set, counted_ids, roi_counts,
+                frame=frame, crop_rect=crop_rect, render=render, source=str(video_path)
             )
-            
-            annotated_frame = results[0].plot()
-            
-            overlay = annotated_frame.copy()
-            cv2.fillPoly(annotated_frame, [region_points], (128, 0, 128))
-            cv2.addWeighted(overlay, alpha, annotated_frame, 1 - alpha, 0, annotated_frame)
-            cv2.polylines(annotated_frame, [region_points], isClosed=True, color=(0, 0, 255), thickness=2)
-
-            if results[0].boxes.id is not None:
-                ids = results[0].boxes.id.cpu().numpy().astype(int)
-                boxes = results[0].boxes.xyxy.cpu().numpy()
-                
-                for i, box in enumerate(boxes):
-                    obj_id = ids[i]
-                    x1, y1, x2, y2 = box
-                    cx = int((x1 + x2) / 2)
-                    cy = int((y1 + y2) / 2)
-                    cv2.circle(annotated_frame, (cx, cy), 4, (0, 255, 0), -1)
-                    
-                    result = cv2.pointPolygonTest(region_points, (cx, cy), False)
-                    if result >= 0:
-                        if obj_id not in counted_ids:
-                            counted_ids.add(obj_id)
-                            local_bag_count += 1
-                            print(f"Bags counted: {local_bag_count}")
-                            firebase_queue.put(local_bag_count)
-
-            cv2.putText(annotated_frame, f"Count: {local_bag_count}", (50, 50),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-
-            if frame_queue is not None:
-                try:
-                    frame_queue.put(annotated_frame, block=False)
-                except:
-                    pass
+            if render:
+                preview.publish(annotated_frame)
+            cap.record_latency(captured_at)
+            processed += 1
+            scheduler.record(time.perf_counter() - step_start,
+                             near_roi(results[0], roi_set, frame.shape, crop_rect))
 
     except Exception as e:
         print(f"ERROR: Bag counter failed: {e}")
     finally:
-        firebase_worker_stop.set()
+        release_firebase_worker()
         cap.release()
+        _print_capture_stats("Bag counter", cap)
+        _print_track_stats("Bag counter", counted_ids)
+        _print_gate_stats("Bag counter", gate)
+        _print_scheduler_stats("Bag counter", scheduler)
+        elapsed = time.time() - start_time
+        if processed and elapsed > 0:
+            mode = "ROI-cropped" if crop_rect else "full-frame"
+            print(f"Bag counter FPS ({mode}): {processed / elapsed:.1f}")
         print("Bag counter video released")
+
+    return local_bag_count
+
+
+# ===========================
+# Multi-Camera Bag Counter
+# ===========================
+class BagStream:
+    """Per-camera state for the batched multi-stream counter"""
+
+    def __init__(self, name, video_path, frame_queue=None, threaded_capture=None,
+                 roi_set=None, preview_fps=PREVIEW_FPS, motion_gate=MOTION_GATE):
+        self.name = name
+        self.video_path = video_path
+        self.preview = PreviewGate(frame_queue, preview_fps)
+        self.cap = open_frame_source(video_path, threaded=threaded_capture)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        self.tracker = create_tracker(frame_rate=int(fps) or 30)
+        self.gate = MotionGate() if motion_gate else None
+        self.roi_set = roi_set or rois
+        self.counted_ids, self.roi_counts = new_count_state(self.roi_set)
+        self.bag_count = 0
+        self.finished = not self.cap.isOpened()
+
+
+def run_multi_bag_counter(video_paths, frame_queues=None, stop_event=None, threaded_capture=None,
+                          roi_sets=None, preview_fps=PREVIEW_FPS, motion_gate=MOTION_GATE):
+    """
+    Count bags on several loading bays with one batched YOLO call per step.
+
+    Each step grabs the latest frame from every live source, runs them
+    through the model together, and feeds each camera's detections to its
+    own tracker and counting state.
+    """
+    frame_queues = frame_queues or [None] * len(video_paths)
+    roi_sets = roi_sets or [None] * len(video_paths)
+    streams = [
+        BagStream(f"cam{i}", path, fq, threaded_capture, roi, preview_fps, motion_gate)
+        for i, (path, fq, roi) in enumerate(zip(video_paths, frame_queues, roi_sets))
+    ]
+    for stream in streams:
+        if stream.finished:
+            print(f"ERROR: Cannot open video: {stream.video_path}")
+
+    model = create_bag_model()
+    names = model.names
+    print(f"Starting multi-stream bag counter ({len(streams)} cameras)...")
+    acquire_firebase_worker()
+
+    processed = 0
+    start_time = time.time()
+
+    try:
+        while True:
+            if stop_event and stop_event.is_set():
+                break
+
+            active, frames, captured = [], [], []
+            for stream in streams:
+                if stream.finished:
+                    continue
+                ret, frame, captured_at = stream.cap.read()
+                if not ret:
+                    stream.finished = True
+                    continue
+                active.append(stream)
+                frames.append(frame)
+                captured.append(captured_at)
+
+            if not active:
+                break
+
+            # Only frames with motion go into the batch; static ones get empty results
+            needs = [s.gate is None or s.gate.should_infer(f) for s, f in zip(active, frames)]
+            batch = [i for i, need in enumerate(needs) if need]
+            results = [empty_result(f, names) for f in frames]
+            if batch:
+                tracked = track_batch(model, [frames[i] for i in batch], [active[i].tracker for i in batch])
+                for i, result in zip(batch, tracked):
+                    results[i] = result
+
+            for stream, result, captured_at in zip(active, results, captured):
+                render = stream.preview.due()
+                annotated_frame, stream.bag_count = annotate_and_count(
+                    result, stream.roi_set, stream.counted_ids, stream.roi_counts,
+                    label=f"[{stream.name}] Bags counted", render=render,
+                    source=f"{stream.name}:{stream.video_path}"
+                )
+                if render:
+                    stream.preview.publish(annotated_frame)
+                stream.cap.record_latency(captured_at)
+
+            processed += len(frames)
+
+    except Exception as e:
+        print(f"ERROR: Multi-stream bag counter failed: {e}")
+    finally:
+        release_firebase_worker()
+        for stream in streams:
+            stream.cap.release()
+            _print_capture_stats(f"[{stream.name}]", stream.cap)
+            _print_track_stats(f"[{stream.name}]", stream.counted_ids)
+            _print_gate_stats(f"[{stream.name}]", stream.gate)
+        elapsed = time.time() - start_time
+        if elapsed > 0:
+            print(f"Multi-stream throughput: {processed / elapsed:.1f} frames/s")
+        print("Multi-stream bag counter released")
+
+    return {stream.name: stream.bag_count for stream in streams}
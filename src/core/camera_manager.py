@@ -40,6 +40,9 @@ print("OK: Modules imported")
 # --- Event to control thread shutdown ---
 stop_event = threading.Event()
 
+# --- Set while the OpenCV window is open (pipelines skip annotation otherwise) ---
+display_active = threading.Event()
+
 # --- Create 2 queues shared between threads ---
 bag_queue = queue.Queue(maxsize=2)
 plate_queue = queue.Queue(maxsize=2)
@@ -47,6 +50,7 @@ plate_queue = queue.Queue(maxsize=2)
 # --- Function to display video frames ---
 def display_thread():
     print("Starting 2-stream display thread...")
+    display_active.set()
     
     # Keep last frame to avoid black screen
     last_bag_frame = None
@@ -96,6 +100,7 @@ def display_thread():
             stop_event.set()
             break
 
+    display_active.clear()
     cv2.destroyAllWindows()
     print("OK: Display window closed")
 
@@ -107,7 +112,8 @@ def start_license_plate_thread():
         run_license_plate(
             "data/video/LicensePlate/CaiSon_DocBangSo.mp4", 
             frame_queue=plate_queue,
-            stop_event=stop_event
+            stop_event=stop_event,
+            display_active=display_active
         )
     except Exception as e:
         print(f"ERROR: License plate thread failed: {e}")
@@ -123,7 +129,8 @@ def start_bag_counter_thread():
         run_bag_counter(
             "data/video/Day/nuoc_da_bao1_ngay.mp4", 
             frame_queue=bag_queue,
-            stop_event=stop_event
+            stop_event=stop_event,
+            display_active=display_active
         )
     except Exception as e:
         print(f"ERROR: Bag counter thread failed: {e}")
@@ -0,0 +1,384 @@
+"""
+Dashboard Data Module
+Data access shared by the Streamlit dashboards, free of Streamlit itself
+(src/ui/dashboard_ui.py adds caching and error display on top)
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from src.core.storage import Event, get_storage
+
+LICENSE_PLATES = "license_plates"
+# Per-day / per-plate aggregates maintained by firebase_handler at write time
+ROLLUPS = "license_plate_stats"
+
+PlateFetch = namedtuple("PlateFetch", ["data", "seconds", "start", "end"])
+
+# Dashboard DataFrame columns: date, plate, bag count, time of the last update
+PLATE_COLUMNS = ["Ngày", "Biển Số", "Số Bao", "Thời Gian"]
+
+
+def date_range(days, end=None):
+    """("YYYY-MM-DD", "YYYY-MM-DD") covering the last `days` days, today included"""
+    end = end or datetime.now()
+    return (end - timedelta(days=days - 1)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def fetch_license_plates(days=1, end=None, storage=None):
+    """
+    {date: {plate_key: record}} for the last `days` days in one ordered
+    key-range query (order_by_key().start_at().end_at()) instead of one
+    GET per day. Returns a PlateFetch with the fetch time in seconds.
+    """
+    start_key, end_key = date_range(days, end)
+    started = time.perf_counter()
+    data = (storage or get_storage()).query_range(LICENSE_PLATES, start_key, end_key)
+    return PlateFetch(dict(data or {}), time.perf_counter() - started, start_key, end_key)
+
+
+def fetch_rollups(days=1, end=None, storage=None):
+    """{date: {"bags", "trucks", "plates": {plate: {"bags", "trucks"}}}} for the last `days` days"""
+    start_key, end_key = date_range(days, end)
+    return dict((storage or get_storage()).query_range(ROLLUPS, start_key, end_key) or {})
+
+
+def summarize_rollups(rollups):
+    """
+    Dashboard totals from rollup nodes, without touching raw records:
+    {"bags", "trucks", "daily": {date: bags}, "plates": {plate: bags}}
+    """
+    summary = {"bags": 0, "trucks": 0, "daily": {}, "plates": {}}
+    for day, rollup in sorted(rollups.items()):
+        if not isinstance(rollup, dict):
+            continue
+        summary["bags"] += rollup.get("bags", 0)
+        summary["trucks"] += rollup.get("trucks", 0)
+        summary["daily"][day] = rollup.get("bags", 0)
+        for plate, totals in (rollup.get("plates") or {}).items():
+            if isinstance(totals, dict):
+                summary["plates"][plate] = summary["plates"].get(plate, 0) + totals.get("bags", 0)
+    return summary
+
+
+# ==============================
+# Typed columnar DataFrame
+# ==============================
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_datetime(text):
+    try:
+        return np.datetime64(text, "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+
+class PlateFrameBuilder:
+    """
+    Typed DataFrame of license plate records, built column by column.
+
+    Each day is converted once into preallocated NumPy arrays: plate codes
+    into a shared category list (categorical 'Biển Số'), int64 'Số Bao',
+    datetime64 'Ngày' and 'Thời Gian' (date + parsed "HH:MM:SS"). Days are
+    kept as separate blocks, so appending or replacing a day only converts
+    that day; frame() concatenates the blocks' arrays. Plate codes stay
+    valid as categories grow, so blocks never need re-encoding.
+    """
+
+    def __init__(self):
+        self.categories = []
+        self._codes = {}
+        self.blocks = {}
+        self.block_versions = {}
+
+    def _code(self, plate):
+        code = self._codes.get(plate)
+        if code is None:
+            code = self._codes[plate] = len(self.categories)
+            self.categories.append(plate)
+        return code
+
+    def _build_block(self, date, plates):
+        records = [r for r in plates.values() if isinstance(r, dict)] if isinstance(plates, dict) else []
+        n = len(records)
+        codes = np.fromiter(map(self._code, [str(r.get("plate", "N/A")) for r in records]), np.int32, n)
+
+        bags = [r.get("bag", 0) for r in records]
+        try:
+            bags = np.array(bags, np.int64).reshape(n)
+        except (TypeError, ValueError, OverflowError):
+            bags = np.fromiter(map(_to_int, bags), np.int64, n)
+
+        day = _to_datetime(date).astype("datetime64[ns]")
+        dates = np.full(n, day)
+        # "YYYY-MM-DDTHH:MM:SS" parses in one vectorized call; malformed reads fall back per record
+        stamps = [f"{date}T{t}" if isinstance(t, str) else "NaT" for t in (r.get("timestamp") for r in records)]
+        try:
+            times = np.array(stamps, "datetime64[s]").reshape(n)
+        except ValueError:
+            times = np.array([_to_datetime(stamp) for stamp in stamps], "datetime64[s]").reshape(n)
+        if np.isnat(day):
+            times[:] = np.datetime64("NaT")
+        return {"codes": codes, "bags": bags, "dates": dates, "times": times.astype("datetime64[ns]")}
+
+    def update_day(self, date, plates, version=None):
+        """Convert one day's {plate_key: record}; skipped if `version` did not change. True if rebuilt"""
+        if version is not None and self.block_versions.get(date) == version:
+            return False
+        self.blocks[date] = self._build_block(date, plates)
+        self.block_versions[date] = version
+        return True
+
+    def drop_day(self, date):
+        self.blocks.pop(date, None)
+        self.block_versions.pop(date, None)
+
+    def frame(self, dates=None):
+        """DataFrame (PLATE_COLUMNS) of the given days (default: all), in date order"""
+        blocks = [self.blocks[d] for d in sorted(self.blocks if dates is None else dates) if d in self.blocks]
+        if not blocks:
+            return pd.DataFrame(columns=PLATE_COLUMNS)
+        column = lambda name: np.concatenate([block[name] for block in blocks])
+        plates = pd.Categorical.from_codes(column("codes"), categories=self.categories)
+        return pd.DataFrame({
+            "Ngày": column("dates"),
+            "Biển Số": plates.remove_unused_categories(),
+            "Số Bao": column("bags"),
+            "Thời Gian": column("times"),
+        })
+
+
+def build_plate_frame(raw_data):
+    """Typed DataFrame of a {date: {plate_key: record}} snapshot in one pass"""
+    builder = PlateFrameBuilder()
+    for date, plates in raw_data.items():
+        builder.update_day(date, plates)
+    return builder.frame()
+
+
+# ==============================
+# Live sync (process-wide)
+# ==============================
+class LicensePlateSync:
+    """
+    Process-wide live copy of license_plates/ for the dashboards.
+
+    The last `days` days are loaded once with a range query; after that a
+    listener on today's node streams deltas (put / patch events) into the
+    in-memory table, so nothing is downloaded again when one plate's bag
+    count changes. Every applied change bumps `version`: sessions rebuild
+    their views only when it moved, and frame() reconverts only the days
+    whose version changed. Yesterday is listened to as well: a truck
+    still loading after midnight keeps writing to the day its plate was
+    read. Older days are not expected to change and are not listened to.
+    Listeners of a local backend only see writes made in this process, so
+    when the storage's change_token() moves (the pipeline wrote from
+    another process) the followed days are queried again.
+    """
+
+    # Days followed live: yesterday and today
+    FOLLOW_DAYS = 2
+
+    def __init__(self, days=30, storage=None):
+        self.days = days
+        self.storage = storage or get_storage()
+        self.data = {}
+        self.version = 0
+        self.day_versions = {}
+        self.builder = PlateFrameBuilder()
+        self._frames = {}
+        self.day = None
+        self.listeners = {}
+        self.load_seconds = 0.0
+        self.events = 0
+        self.reloads = 0
+        self._token = None
+        self._lock = threading.RLock()
+
+    def start(self):
+        self._token = self.storage.change_token()
+        fetch = fetch_license_plates(self.days, storage=self.storage)
+        with self._lock:
+            self.data = fetch.data
+            self.load_seconds = fetch.seconds
+            self.version += 1
+            self.day_versions = dict.fromkeys(self.data, self.version)
+        self._follow_today()
+        return self
+
+    def refresh(self):
+        """Follow the recent days, and reload them if another process wrote to the storage"""
+        self._follow_today()
+        token = self.storage.change_token()
+        with self._lock:
+            if token is None or token == self._token:
+                return
+            self._token, days = token, list(self.listeners)
+        for day in days:
+            data = self.storage.get(f"{LICENSE_PLATES}/{day}")
+            with self._lock:
+                if data != self.data.get(day):
+                    self._apply(day, Event("put", "/", data))
+                    self.reloads += 1
+
+    def _follow_today(self):
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        with self._lock:
+            if today == self.day:
+                return
+            self.day = today
+            followed = [(now - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(self.FOLLOW_DAYS)]
+            for day in [d for d in self.listeners if d not in followed]:
+                self.listeners.pop(day).close()
+            days = [d for d in reversed(followed) if d not in self.listeners]
+        # each listener's first event is a full put of its day's node
+        for day in days:
+            self.listeners[day] = self.storage.listen(f"{LICENSE_PLATES}/{day}",
+                                                      lambda e, day=day: self._apply(day, e))
+
+    def _apply(self, day, event):
+        keys = [key for key in event.path.strip("/").split("/") if key]
+        with self._lock:
+            if event.event_type == "patch" and isinstance(event.data, dict):
+                changes = [(keys + key.strip("/").split("/"), value) for key, value in event.data.items()]
+            else:
+                changes = [(keys, event.data)]
+            for path, value in changes:
+                self._set(day, path, value)
+            self.events += 1
+            self.version += 1
+            self.day_versions[day] = self.version
+
+    def _set(self, day, keys, value):
+        if not keys:
+            if isinstance(value, dict) and value:
+                self.data[day] = value
+            else:
+                self.data.pop(day, None)
+            return
+        node = self.data.setdefault(day, {})
+        for key in keys[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+        if value is None:
+            node.pop(keys[-1], None)
+        else:
+            node[keys[-1]] = value
+
+    def _expire(self):
+        for day in [d for d in self.data if d < date_range(self.days)[0]]:
+            del self.data[day]
+            self.day_versions.pop(day, None)
+
+    def snapshot(self, days=None):
+        """(version, {date: {plate_key: record}}) for the last `days` days (<= self.days)"""
+        self.refresh()
+        start_key, _ = date_range(min(days or self.days, self.days))
+        with self._lock:
+            self._expire()
+            return self.version, {
+                day: {key: dict(record) if isinstance(record, dict) else record
+                      for key, record in plates.items()}
+                for day, plates in self.data.items() if day >= start_key
+            }
+
+    def frame(self, days=None):
+        """
+        Typed DataFrame (PLATE_COLUMNS) of the last `days` days, cached per
+        window and version. Only days changed since the previous call are
+        converted again. Shared between sessions: do not modify in place.
+        """
+        self.refresh()
+        start_key, _ = date_range(min(days or self.days, self.days))
+        with self._lock:
+            cached = self._frames.get(start_key)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            self._expire()
+            for day in [d for d in self.builder.blocks if d not in self.data]:
+                self.builder.drop_day(day)
+            for day, plates in self.data.items():
+                self.builder.update_day(day, plates, self.day_versions.get(day))
+            frame = self.builder.frame([d for d in self.data if d >= start_key])
+            self._frames = {k: v for k, v in self._frames.items() if k >= date_range(self.days)[0]}
+            self._frames[start_key] = (self.version, frame)
+            return frame
+
+    def stats(self):
+        self.refresh()
+        with self._lock:
+            return {
+                "version": self.version,
+                "days_loaded": len(self.data),
+                "events": self.events,
+                "reloads": self.reloads,
+                "load_ms": 1000 * self.load_seconds,
+            }
+
+    def close(self):
+        for listener in self.listeners.values():
+            listener.close()
+        self.listeners = {}
+
+
+_sync = None
+_sync_lock = threading.Lock()
+
+
+def get_license_plate_sync(days=30):
+    """The process-wide LicensePlateSync, loaded on first use"""
+    global _sync
+    with _sync_lock:
+        if _sync is None:
+            _sync = LicensePlateSync(days).start()
+        return _sync
+
+
+# ==============================
+# Dashboard helpers (wrapped for Streamlit in src/ui/dashboard_ui.py)
+# ==============================
+def get_data_version():
+    """(version, initial load ms) of the process-wide live copy of license_plates/"""
+    stats = get_license_plate_sync().stats()
+    return stats["version"], stats["load_ms"]
+
+
+def get_plate_dataframe(days, version):
+    """
+    Typed DataFrame (PLATE_COLUMNS) of the last `days` days from the live
+    copy, cached per version; version < 0 (data unavailable) gives an empty
+    frame. Shared between sessions: do not modify in place.
+    """
+    if version < 0:
+        return pd.DataFrame(columns=PLATE_COLUMNS)
+    return get_license_plate_sync().frame(days)
+
+
+def rollup_summary(days, version):
+    """summarize_rollups() of the last `days` days; empty when version < 0"""
+    if version < 0:
+        return summarize_rollups({})
+    return summarize_rollups(fetch_rollups(days))
+
+
+def plate_column_config(column_config):
+    """Display formats of the datetime64 columns, built with st.column_config (passed in)"""
+    return {
+        "Ngày": column_config.DateColumn(format="YYYY-MM-DD"),
+        "Thời Gian": column_config.DatetimeColumn(format="HH:mm:ss"),
+    }
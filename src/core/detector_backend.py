@@ -0,0 +1,89 @@
+"""
+Detector Backend Module
+Run YOLO detectors through PyTorch, ONNX Runtime or OpenVINO
+"""
+
+import importlib.util
+from pathlib import Path
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+# Runtime package each exported backend needs
+_RUNTIME_PACKAGES = {
+    "onnx": "onnxruntime",
+    "openvino": "openvino",
+}
+
+
+def backend_available(backend):
+    """True if the runtime for backend is installed"""
+    if backend == "torch":
+        return True
+    package = _RUNTIME_PACKAGES.get(backend)
+    return package is not None and importlib.util.find_spec(package) is not None
+
+
+def select_backend(requested="auto", device="cpu"):
+    """
+    Resolve "auto" (or an unavailable backend) to one that can run here.
+    auto: PyTorch on GPU; on CPU prefer OpenVINO, then ONNX Runtime.
+    """
+    if requested == "auto":
+        if str(device).startswith("cuda"):
+            return "torch"
+        for backend in ("openvino", "onnx"):
+            if backend_available(backend):
+                return backend
+        return "torch"
+
+    if requested not in BACKENDS:
+        print(f"WARNING: Unknown backend '{requested}', using torch")
+        return "torch"
+    if not backend_available(requested):
+        print(f"WARNING: {_RUNTIME_PACKAGES[requested]} not installed, using torch")
+        return "torch"
+    return requested
+
+
+def exported_path(weights, backend):
+    """Where ultralytics writes the exported model for backend"""
+    weights = Path(weights)
+    if backend == "onnx":
+        return weights.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights.parent / f"{weights.stem}_openvino_model"
+    return weights
+
+
+def export_weights(weights, backend, imgsz=640):
+    """Export .pt weights for backend (dynamic batch so batched inference works)"""
+    from ultralytics import YOLO
+
+    print(f"Exporting {weights} to {backend}...")
+    return Path(YOLO(str(weights)).export(format=backend, imgsz=imgsz, dynamic=True, verbose=False))
+
+
+def resolve_weights(weights, backend="auto", device="cpu", imgsz=640):
+    """
+    Return (path_to_load, backend_used). Exported graphs are reused if they
+    exist next to the .pt file, otherwise exported once. Any failure falls
+    back to the PyTorch weights.
+    """
+    weights = Path(weights)
+    if weights.suffix == ".onnx":
+        return weights, "onnx"
+    if weights.name.endswith("_openvino_model"):
+        return weights, "openvino"
+
+    backend = select_backend(backend, device)
+    if backend == "torch":
+        return weights, "torch"
+
+    path = exported_path(weights, backend)
+    if not path.exists():
+        try:
+            path = export_weights(weights, backend, imgsz)
+        except Exception as e:
+            print(f"WARNING: {backend} export failed ({e}), using torch")
+            return Path(weights), "torch"
+    return path, backend
@@ -1,11 +1,14 @@
 """
 Firebase Handler Module
 Realtime Database operations for License Plates and Bag Counts
+(on the storage backend chosen by STORAGE_BACKEND; nothing connects at import)
 """
 
 import logging
 import os
 import sys
+import threading
+import time
 
 # Disable all verbose logging BEFORE importing firebase
 logging.basicConfig(level=logging.ERROR)
@@ -18,28 +21,97 @@ logging.getLogger('urllib3').setLevel(logging.ERROR)
 # Suppress environment variable warnings
 os.environ['PYTHONWARNINGS'] = 'ignore'
 
-import firebase_admin
-from firebase_admin import credentials, db
 from datetime import datetime
 
-# --- Firebase setup ---
-if not firebase_admin._apps:
-    cred = credentials.Certificate("firebase-key.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://smarticetracker-default-rtdb.asia-southeast1.firebasedatabase.app/'
-    })
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config.settings import (
+    FIREBASE_FLUSH_INTERVAL, FIREBASE_FLUSH_MAX_KEYS, FIREBASE_OUTBOX, FIREBASE_OUTBOX_BATCH,
+    STORAGE_BACKEND,
+)
+from src.core.outbox import WriteAheadLog
+from src.core.storage import combine_writes, get_storage, increment
+
+# Write-time aggregates next to license_plates/ (read by the dashboards)
+ROLLUPS = "license_plate_stats"
 
 # --- Biến toàn cục để theo dõi biển số hiện tại ---
 current_plate = None
 
 
-def save_license_plate_and_bag(plate_text=None, bag_count=None):
+class PlateBagTally:
+    """
+    Bags loaded onto the current plate, from the running totals of any
+    number of counters (one per camera / loading bay). Every counter's
+    total when the plate changes is its baseline for the new truck. The
+    truck stays on the day its plate was read, also past midnight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plate = None
+        self.day = None
+        self.written = 0
+        self._totals = {}
+        self._baselines = {}
+
+    def start(self, plate, day):
+        """New truck: the counts so far belong to the previous plate"""
+        with self._lock:
+            self.plate, self.day, self.written = plate, day, 0
+            self._baselines = dict(self._totals)
+
+    def update(self, source, total):
+        """
+        Record one counter's running total.
+        Returns (plate, day, bags on plate so far, change since the last call).
+        """
+        with self._lock:
+            self._totals[source] = total
+            bags = sum(t - self._baselines.get(s, 0) for s, t in self._totals.items())
+            return self.plate, self.day, bags, self._record(bags)
+
+    def record(self, bags):
+        """Bag count written for the plate directly; returns the change for the rollups"""
+        with self._lock:
+            return self._record(bags)
+
+    def _record(self, bags):
+        delta, self.written = bags - self.written, bags
+        return delta
+
+
+bag_tally = PlateBagTally()
+
+
+def rollup_updates(day, plate, bags=0, trucks=0):
+    """
+    Increments for the aggregates of one day:
+    /license_plate_stats/YYYY-MM-DD/
+        - bags, trucks
+        - plates/<license_plate>/bags, trucks
+    """
+    base = f"{ROLLUPS}/{day}"
+    updates = {}
+    for field, n in (("bags", bags), ("trucks", trucks)):
+        if n:
+            updates[f"{base}/{field}"] = increment(n)
+            updates[f"{base}/plates/{plate}/{field}"] = increment(n)
+    return updates
+
+
+def save_license_plate_and_bag(plate_text=None, bag_count=None, new_visit=True):
     """
-    Save data to Firebase:
+    Save data to Firebase (through the local outbox):
     /license_plates/YYYY-MM-DD/plate:<license_plate>/
         - plate
         - bag
+        - visits
         - timestamp
+    A new plate is one truck visit (visits + 1, trucks + 1 in the day's
+    rollups) unless new_visit is False (the same truck back within the
+    dedup window). bag and visits only grow by the increments added to the
+    rollups, in the same update, so the rollups stay equal to the sums
+    over the records (rebuild_rollups computes them the same way).
     """
     global current_plate
     try:
@@ -49,43 +121,245 @@ def save_license_plate_and_bag(plate_text=None, bag_count=None):
         if not plate_text:
             return
 
-        ref = db.reference(f"license_plates/{today}/plate:{plate_text}")
-
         if plate_text != current_plate:
             current_plate = plate_text
-            ref.set({
-                "plate": plate_text,
-                "bag": 0,
-                "timestamp": timestamp
+            bag_tally.start(plate_text, today)
+            path = f"license_plates/{today}/plate:{plate_text}"
+            write_updates({
+                f"{path}/plate": plate_text,
+                f"{path}/bag": increment(0),
+                f"{path}/visits": increment(int(new_visit)),
+                f"{path}/timestamp": timestamp,
+                **rollup_updates(today, plate_text, trucks=int(new_visit)),
             })
             return
 
-        update_data = {"timestamp": timestamp}
+        # Same truck: its record stays on the day the plate was first read
+        day = bag_tally.day or today
+        path = f"license_plates/{day}/plate:{plate_text}"
+        update_data = {f"{path}/timestamp": timestamp}
         if bag_count is not None:
-            update_data["bag"] = bag_count
+            delta = bag_tally.record(bag_count)
+            update_data[f"{path}/bag"] = increment(delta)
+            update_data.update(rollup_updates(day, plate_text, bags=delta))
 
-        ref.update(update_data)
+        write_updates(update_data)
 
     except Exception as e:
         logging.debug(f"Firebase save error: {e}")
 
 
+# --- Outbox (SQLite write-ahead log) + ghi gộp (coalescing) ---
+def _multi_path_update(updates):
+    """One HTTP request for many paths: {"a/b/c": value, ...}"""
+    get_storage().update(updates)
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """
+    Write-ahead log in front of Firebase, started on first use (rows left by
+    a previous run are replayed then). None for local backends, which are
+    written directly.
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None and STORAGE_BACKEND == "firebase":
+            _outbox = WriteAheadLog(FIREBASE_OUTBOX, _multi_path_update, batch_size=FIREBASE_OUTBOX_BATCH,
+                                    lookup=lambda path, start, end: get_storage().query_range(path, start, end))
+            _outbox.start()
+        return _outbox
+
+
+def write_updates(updates):
+    """Multi-path write {path: value}: through the outbox for Firebase, direct otherwise"""
+    outbox = get_outbox()
+    if outbox is None:
+        _multi_path_update(updates)
+    else:
+        outbox.append(updates)
+
+
+class CoalescingWriter:
+    """
+    Buffer Firebase writes and send them as one multi-path update.
+
+    put() only records the latest value per path; a background thread
+    flushes every flush_interval seconds, or as soon as max_keys paths are
+    pending. A failed flush is kept (newer values win, increments add up)
+    and retried on the next flush.
+    """
+
+    def __init__(self, flush_interval=0.5, max_keys=100, sender=_multi_path_update):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.sender = sender
+        self.pending = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.puts = 0
+        self.paths_sent = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def put(self, path, value):
+        self.put_many({path: value})
+
+    def update(self, base, values):
+        """Like ref(base).update(values): update("a/b", {"x": 1}) -> "a/b/x" = 1"""
+        self.put_many({f"{base}/{key}": value for key, value in values.items()})
+
+    def put_many(self, paths):
+        """One logical write of {path: value}"""
+        with self._cond:
+            for path, value in paths.items():
+                self.pending[path] = combine_writes(self.pending.get(path), value)
+            self.puts += 1
+            if len(self.pending) >= self.max_keys:
+                self._cond.notify()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="FirebaseWriter")
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the thread after a last flush"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self.pending) < self.max_keys:
+                    self._cond.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._cond:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            self.sender(batch)
+        except Exception as e:
+            logging.debug(f"Firebase flush error: {e}")
+            with self._cond:
+                self.failed_flushes += 1
+                for path, value in self.pending.items():
+                    batch[path] = combine_writes(batch.get(path), value)
+                self.pending = batch
+            return
+        latency = time.perf_counter() - start
+        with self._cond:
+            self.flushes += 1
+            self.paths_sent += len(batch)
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "puts": self.puts,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "writes_saved": self.puts - self.flushes,
+                "pending": len(self.pending),
+                "flush_ms_avg": 1000 * self.latency_total / self.flushes if self.flushes else 0.0,
+                "flush_ms_max": 1000 * self.latency_max,
+            }
+
+
+bag_writer = CoalescingWriter(FIREBASE_FLUSH_INTERVAL, FIREBASE_FLUSH_MAX_KEYS, sender=write_updates)
+
+
+def queue_bag_count(total, source="bag_counter"):
+    """
+    Queue the bag count of the plate being loaded (current_plate) for the
+    next coalesced flush, with the change added to the day's rollups:
+    /license_plates/YYYY-MM-DD/plate:<license_plate>/bag, timestamp
+    total is the running count of one counter (source, e.g. a camera);
+    the record gets the bags counted by all counters since the plate changed.
+    """
+    plate, day, _, delta = bag_tally.update(source, total)
+    if not plate:
+        return
+    path = f"license_plates/{day}/plate:{plate}"
+    bag_writer.put_many({
+        f"{path}/bag": increment(delta),
+        f"{path}/timestamp": datetime.now().strftime("%H:%M:%S"),
+        **rollup_updates(day, plate, bags=delta),
+    })
+
+
+def _count(value, default):
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def rebuild_rollups(days=30):
+    """
+    Recompute license_plate_stats/ from the raw records of the last `days`
+    days (backfill of days written before the rollups existed, or repair
+    after records were edited by hand). Trucks are the records' visits,
+    as counted live; records older than the visits field count as one.
+    """
+    from src.core.dashboard_data import date_range
+
+    storage = get_storage()
+    start_key, end_key = date_range(days)
+    for day, plates in (storage.query_range("license_plates", start_key, end_key) or {}).items():
+        rollup = {"bags": 0, "trucks": 0, "plates": {}}
+        for record in (plates or {}).values():
+            if not isinstance(record, dict):
+                continue
+            bags = _count(record.get("bag"), 0)
+            visits = _count(record.get("visits"), 1)
+            totals = rollup["plates"].setdefault(str(record.get("plate", "N/A")), {"bags": 0, "trucks": 0})
+            for target in (rollup, totals):
+                target["bags"] += bags
+                target["trucks"] += visits
+        storage.set(f"{ROLLUPS}/{day}", rollup)
+        print(f"{day}: {rollup['trucks']} trucks, {rollup['bags']} bags, {len(rollup['plates'])} plates")
+
+
 # --- Các hàm phụ ---
 def update_total_count(new_count):
     """Update total bag count."""
     try:
-        total_ref = db.reference("total_count")
-        total_ref.set(new_count)
+        write_updates({"total_count": new_count})
     except Exception as e:
         logging.debug(f"Total count update error: {e}")
 
 
 def listen_total_count(callback):
     """Lắng nghe thay đổi của total_count từ Firebase."""
-    ref = db.reference("total_count")
-
     def listener(event):
         if event.data is not None:
             callback(event.data)
 
-    ref.listen(listener)
+    return get_storage().listen("total_count", listener)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild license_plate_stats/ from license_plates/")
+    parser.add_argument("--days", type=int, default=30)
+    rebuild_rollups(parser.parse_args().days)
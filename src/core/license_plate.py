@@ -21,36 +21,113 @@ for logger_name in ['ultralytics', 'easyocr', 'torch', 'google', 'urllib3']:
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
 import cv2
-import torch
-from ultralytics import YOLO
-import easyocr
-import numpy as np
 import time
-from datetime import datetime
 
 from src.core.firebase_handler import save_license_plate_and_bag
+from src.utils.camera_helper import open_frame_source, PreviewGate, draw_bbox
+from src.core.model_registry import create_model, get_device
+from src.core.ocr_worker import OcrWorkerPool
+from src.core.plate_index import PlateDeduplicator
+from src.core.plate_tracker import PlateTrackCache, crop_quality
+from src.core.motion_gate import MotionGate
+from src.core.scheduler import FrameScheduler
+from config.settings import (
+    MOTION_GATE, OCR_MODE, OCR_WORKERS, PLATE_CROP_TOP_K, PLATE_DEDUP_WINDOW,
+    PLATE_MAX_EDIT_DISTANCE, PLATE_OCR_READS, PREVIEW_FPS, TARGET_FPS,
+)
 
-def setup_device():
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Device: {device}")
-    return device
+MODEL_PATH = "model/best.pt"
 
-device = setup_device()
 
-# Load YOLO model for license plate detection
-print("Loading license plate model...")
-model = YOLO("model/best.pt")
+def create_plate_model():
+    """License plate detector of its own (predictor + tracker) for one pipeline, warmed up"""
+    return create_model(MODEL_PATH, device=get_device())
+
+
+# ==============================
+# OCR results -> plates -> Firebase
+# ==============================
+def emit_plates(ready, dedup):
+    """Switch the current plate for finalized [(track_id, read)] plates that are not jitter of it"""
+    for track_id, read_text in ready:
+        plate_text, switched, new_visit = dedup.canonical(read_text)
+        if switched:
+            again = "" if new_visit else ", back within the dedup window"
+            print(f"License plate detected: {plate_text} (track {track_id}, read {read_text}{again})")
+
+            try:
+                save_license_plate_and_bag(plate_text=plate_text, bag_count=None, new_visit=new_visit)
+            except Exception as e:
+                logging.debug(f"Firebase save error: {e}")
+
+
+def submit_due(ocr_pool, plate_cache, frame_index):
+    """One batched OCR call for the tracks due; non-blocking, crops stay buffered if workers are busy"""
+    due = plate_cache.due(frame_index)
+    if not due:
+        return 0
+    track_ids = [track_id for track_id, _ in due]
+    accepted = ocr_pool.submit_batch([crop for _, crop in due], keys=track_ids)
+    for track_id in track_ids[:accepted]:
+        plate_cache.mark_submitted(track_id, frame_index)
+    return accepted
+
+
+def ocr_step(ocr_pool, plate_cache, dedup, frame_index):
+    """Merge finished OCR reads, OCR the best buffered crops, emit plates whose vote is final"""
+    for read in ocr_pool.poll():
+        plate_cache.add_read(read.key, read.text, read.conf)
+    submit_due(ocr_pool, plate_cache, frame_index)
+    emit_plates(plate_cache.finalize(frame_index), dedup)
+
+
+def flush_plates(ocr_pool, plate_cache, dedup, frame_index, timeout=10.0):
+    """
+    End of stream / shutdown: every track counts as lost, so its remaining
+    buffered crops are OCR'd; the reads are waited for (up to timeout
+    seconds per round) and every track with a read is emitted.
+    """
+    final_index = frame_index + plate_cache.lost_frames + 1
+    for _ in range(plate_cache.max_reads):
+        if not ocr_pool.drain(timeout):
+            break
+        for read in ocr_pool.poll():
+            plate_cache.add_read(read.key, read.text, read.conf)
+        if not submit_due(ocr_pool, plate_cache, final_index):
+            break
+    ocr_pool.drain(timeout)
+    for read in ocr_pool.poll():
+        plate_cache.add_read(read.key, read.text, read.conf)
+    emit_plates(plate_cache.finalize(final_index, flush=True), dedup)
 
-# Initialize EasyOCR (GPU if available)
-print("Initializing OCR...")
-reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available(), verbose=False)
 
 # ==============================
 # License Plate Detection Function
 # ==============================
-def run_license_plate(video_path, frame_queue=None, stop_event=None):
+def run_license_plate(video_path, frame_queue=None, stop_event=None, threaded_capture=None,
+                      preview_fps=PREVIEW_FPS, display_active=None, motion_gate=MOTION_GATE,
+                      target_fps=TARGET_FPS, ocr_workers=OCR_WORKERS):
+    """
+    Annotation only runs when a preview consumer exists (frame_queue, and
+    display_active set if given) and at most preview_fps times per second.
+    motion_gate: skip detection/OCR on static frames.
+    target_fps: adaptive frame stride (FrameScheduler); full rate while a
+    plate is in view.
+    Plates are tracked; every crop gets a quality score (sharpness, size,
+    aspect ratio, frame edge) and the best PLATE_CROP_TOP_K crops of each
+    track are buffered. Only the best ones are OCR'd, at most
+    PLATE_OCR_READS times per track, in a process pool (ocr_workers); the
+    reads are combined by
+    confidence-weighted character voting and the plate is emitted once
+    per vehicle. Before any Firebase write the plate is normalized,
+    validated against the Vietnamese format and collapsed onto the current
+    plate if it is a near-duplicate of it; any other plate switches the
+    current plate (a new truck unless seen within PLATE_DEDUP_WINDOW seconds).
+    """
+    preview = PreviewGate(frame_queue, preview_fps, display_active)
+    gate = MotionGate() if motion_gate else None
     print(f"Opening license plate video: {video_path}")
-    cap = cv2.VideoCapture(video_path)
+    cap = open_frame_source(video_path, threaded=threaded_capture)
     
     if not cap.isOpened():
         print(f"ERROR: Cannot open license plate video: {video_path}")
@@ -62,24 +139,35 @@ def run_license_plate(video_path, frame_queue=None, stop_event=None):
     
     print(f"Video info: {width}x{height} @ {fps}fps")
 
-    last_plate = None
-    last_ocr_time = 0
-    ocr_cooldown = 1.5
-    frame_skip = 1
-    frame_count = 0
+    print("Loading license plate model...")
+    model = create_plate_model()
+    device = get_device()
+    print("Initializing OCR workers...")
+    ocr_pool = OcrWorkerPool(workers=ocr_workers, gpu=device == 'cuda', mode=OCR_MODE)
+
+    dedup = PlateDeduplicator(max_distance=PLATE_MAX_EDIT_DISTANCE, window=PLATE_DEDUP_WINDOW)
+    plate_cache = PlateTrackCache(max_reads=PLATE_OCR_READS, lost_frames=max(fps, 1),
+                                  top_k=PLATE_CROP_TOP_K, settle_frames=max(fps // 6, 1))
+    frame_index = 0
+    scheduler = FrameScheduler(fps, target_fps,
+                               cost_stride=not cap.drops_frames)
 
     try:
         while cap.isOpened():
             if stop_event and stop_event.is_set():
                 break
 
-            ret, frame = cap.read()
+            ret, frame, captured_at = cap.read()
             if not ret:
                 break
+
+            frame_index += 1
+
+            ocr_step(ocr_pool, plate_cache, dedup, frame_index)
             
-            frame_count += 1
-            if frame_count % frame_skip != 0:
+            if not scheduler.should_process():
                 continue
+            step_start = time.perf_counter()
 
             frame = cv2.resize(frame, (width, height))
             
@@ -87,47 +175,64 @@ def run_license_plate(video_path, frame_queue=None, stop_event=None):
             if h > w:
                 frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
             
-            results = model.predict(frame, imgsz=640, conf=0.4, device=device, verbose=False)
-            annotated_frame = results[0].plot()
-
-            if results[0].boxes:
-                for box in results[0].boxes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    conf = float(box.conf[0])
-                    plate_crop = frame[y1:y2, x1:x2]
-                    if plate_crop.size == 0:
-                        continue
-
-                    current_time = time.time()
-                    plate_text = "Unknown"
-
-                    if current_time - last_ocr_time > ocr_cooldown:
-                        text_results = reader.readtext(plate_crop)
-                        if text_results:
-                            plate_text = max(text_results, key=lambda x: x[2])[1]
-                            last_ocr_time = current_time
-
-                    cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(annotated_frame, plate_text, (x1, max(y1 - 10, 20)),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-
-                    if plate_text != "Unknown" and plate_text != last_plate:
-                        last_plate = plate_text
-                        print(f"License plate detected: {plate_text}")
-
-                        try:
-                            save_license_plate_and_bag(plate_text=plate_text, bag_count=None)
-                        except Exception as e:
-                            logging.debug(f"Firebase save error: {e}")
-
-            if frame_queue is not None:
-                try:
-                    frame_queue.put(annotated_frame, block=False)
-                except:
-                    pass
+            render = preview.due()
+            if gate is not None and not gate.should_infer(frame):
+                if render:
+                    preview.publish(frame)
+                cap.record_latency(captured_at)
+                scheduler.record(time.perf_counter() - step_start)
+                continue
+
+            results = model.track(frame, imgsz=640, conf=0.4, device=device, verbose=False,
+                                  persist=True)
+            annotated_frame = results[0].plot() if render else None
+
+            boxes = results[0].boxes
+            if boxes and boxes.id is not None:
+                ids = boxes.id.cpu().numpy().astype(int)
+                for (x1, y1, x2, y2), track_id in zip(boxes.xyxy.cpu().numpy().astype(int), ids):
+                    plate_cache.seen(track_id, frame_index)
+                    plate_crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+                    if plate_crop.size and plate_cache.needs_ocr(track_id):
+                        score = crop_quality(plate_crop, (x1, y1, x2, y2), frame.shape)
+                        plate_cache.offer(track_id, plate_crop, score)
+
+                    if render:
+                        draw_bbox(annotated_frame, x1, y1, x2, y2, plate_cache.label(track_id),
+                                  color=(0, 255, 0), text_color=(255, 255, 0), font_scale=0.8)
+
+            if render:
+                preview.publish(annotated_frame)
+            cap.record_latency(captured_at)
+            scheduler.record(time.perf_counter() - step_start, near_roi=bool(results[0].boxes))
 
     except Exception as e:
         print(f"ERROR: License plate detection failed: {e}")
     finally:
         cap.release()
+        # The last vehicle's track is still open: read its crops and emit it
+        flush_plates(ocr_pool, plate_cache, dedup, frame_index)
+        ocr_pool.shutdown()
+        stats = ocr_pool.stats()
+        print(f"License plate OCR: {stats['completed']}/{stats['submitted']} reads, "
+              f"{stats['dropped']} dropped (pool busy), queue depth {stats['queue_depth']}, "
+              f"OCR {stats['ocr_ms']:.0f} ms, latency avg {stats['latency_avg_ms']:.0f} ms "
+              f"/ max {stats['latency_max_ms']:.0f} ms")
+        stats = plate_cache.stats()
+        print(f"License plate tracks: {stats['plates_emitted']} plates, {stats['ocr_calls']} OCR calls "
+              f"({stats['ocr_per_plate']:.1f} per plate) from {stats['crops_offered']} crops, "
+              f"avg crop quality {stats['quality_avg']:.2f}")
+        stats = dedup.stats()
+        print(f"License plate dedup: {stats['reads']} reads, {stats['invalid']} invalid, "
+              f"{stats['merged']} merged into the current plate, {stats['revisits']} revisits")
+        stats = cap.stats()
+        print(f"License plate capture: {stats['captured']} frames, {stats['dropped']} dropped, "
+              f"latency avg {stats['latency_avg_ms']:.0f} ms / max {stats['latency_max_ms']:.0f} ms")
+        stats = scheduler.stats()
+        print(f"License plate scheduler: processed {stats['processed']}/{stats['frames']} frames, "
+              f"stride {stats['stride']}, {stats['achieved_fps']:.1f} FPS, cost {stats['cost_ms']:.0f} ms")
+        if gate is not None:
+            stats = gate.stats()
+            print(f"License plate motion gate: skipped {stats['skipped']}/{stats['frames']} frames "
+                  f"({stats['skip_ratio']:.0%})")
         print("License plate video released")
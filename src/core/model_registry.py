@@ -0,0 +1,173 @@
+"""
+Model Registry Module
+Lazy loading of YOLO models and the EasyOCR reader: backend resolution
+and exports are shared, tracking pipelines get a YOLO object of their own
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+_registry_lock = threading.Lock()
+_key_locks = defaultdict(threading.Lock)
+_models = {}
+_load_times = {}
+# (weights, requested backend, device, imgsz) -> (path, backend): exports and fallbacks are decided once
+_resolved = {}
+_device = None
+
+
+def get_device():
+    """Pick CUDA if available (resolved once, on first use)"""
+    global _device
+    if _device is None:
+        import torch
+        _device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        print(f"Device: {_device}")
+    return _device
+
+
+def _load_once(key, loader, warmup=None):
+    """Load key with loader() exactly once, even if several threads ask at the same time"""
+    if key in _models:
+        return _models[key]
+
+    with _registry_lock:
+        key_lock = _key_locks[key]
+
+    with key_lock:
+        if key in _models:
+            return _models[key]
+
+        start = time.perf_counter()
+        obj = loader()
+        load_s = time.perf_counter() - start
+
+        warmup_s = 0.0
+        if warmup is not None:
+            start = time.perf_counter()
+            warmup(obj)
+            warmup_s = time.perf_counter() - start
+
+        _load_times[key] = {"load_s": load_s, "warmup_s": warmup_s}
+        _models[key] = obj
+        print(f"Loaded {key[0]} [{', '.join(str(k) for k in key[1:])}] "
+              f"in {load_s:.2f}s (warm-up {warmup_s:.2f}s)")
+        return obj
+
+
+def _resolve_key(path, device, backend, imgsz):
+    from config.settings import INFERENCE_BACKEND
+    return str(path), backend or INFERENCE_BACKEND, str(device or get_device()), imgsz
+
+
+def resolve_model(path, device=None, backend=None, imgsz=640):
+    """
+    (path_to_load, backend) for weights, resolved once per
+    (weights, requested backend, device): an export runs at most once, and
+    a failed export or load is remembered as a PyTorch fallback instead of
+    being retried on every call.
+    """
+    from src.core.detector_backend import resolve_weights
+
+    key = _resolve_key(path, device, backend, imgsz)
+    if key in _resolved:
+        return _resolved[key]
+
+    with _registry_lock:
+        key_lock = _key_locks[("resolve",) + key]
+
+    with key_lock:
+        if key not in _resolved:
+            _resolved[key] = resolve_weights(path, key[1], key[2], imgsz)
+        return _resolved[key]
+
+
+def _fall_back_to_torch(path, device, backend, imgsz, error):
+    """Remember that the resolved export cannot be loaded: later calls go straight to PyTorch"""
+    key = _resolve_key(path, device, backend, imgsz)
+    resolved, used = _resolved[key]
+    print(f"WARNING: Cannot run {resolved} with {used} ({error}), using torch")
+    _resolved[key] = (path, "torch")
+
+
+def _yolo_loader(path):
+    def loader():
+        from ultralytics import YOLO
+        return YOLO(str(path), task="detect")
+    return loader
+
+
+def _yolo_warmup(device, imgsz):
+    def run_warmup(model):
+        import numpy as np
+        model.predict(np.zeros((imgsz, imgsz, 3), np.uint8), imgsz=imgsz,
+                      device=device, verbose=False)
+    return run_warmup
+
+
+def get_model(path, device=None, backend=None, warmup=True, imgsz=640):
+    """
+    Shared YOLO model for (path, device, backend), loaded on first use.
+    backend: "torch", "onnx", "openvino" or "auto" (default: INFERENCE_BACKEND);
+    exported graphs fall back to PyTorch if the runtime or export is missing.
+    warmup runs one dummy inference so the first real frame is not slow.
+    The YOLO object keeps its predictor (and the track(persist=True)
+    tracker) between calls and is not thread-safe: only for one-off
+    predict() use such as benchmarks. Pipelines use create_model().
+    """
+    device = device or get_device()
+    resolved, used = resolve_model(path, device, backend, imgsz)
+    key = (str(resolved), str(device), used)
+    try:
+        return _load_once(key, _yolo_loader(resolved), _yolo_warmup(device, imgsz) if warmup else None)
+    except Exception as e:
+        if used == "torch":
+            raise
+        _fall_back_to_torch(path, device, backend, imgsz, e)
+        return get_model(path, device, backend, warmup, imgsz)
+
+
+def create_model(path, device=None, backend=None, warmup=True, imgsz=640):
+    """
+    YOLO model of its own for one pipeline (thread). Its predictor and
+    tracker are not shared, so two counters in one process do not feed
+    each other's tracks. The backend choice and any export are shared
+    through resolve_model(); only the weights are read again.
+    """
+    device = device or get_device()
+    resolved, used = resolve_model(path, device, backend, imgsz)
+    try:
+        start = time.perf_counter()
+        model = _yolo_loader(resolved)()
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        if warmup:
+            _yolo_warmup(device, imgsz)(model)
+        warmup_s = time.perf_counter() - start
+    except Exception as e:
+        if used == "torch":
+            raise
+        _fall_back_to_torch(path, device, backend, imgsz, e)
+        return create_model(path, device, backend, warmup, imgsz)
+
+    print(f"Loaded {resolved} [{device}, {used}] in {load_s:.2f}s (warm-up {warmup_s:.2f}s)")
+    return model
+
+
+def get_ocr_reader(languages=('en',), gpu=None):
+    """Shared EasyOCR reader, created on first use"""
+    if gpu is None:
+        gpu = get_device() == 'cuda'
+    key = ("easyocr:" + "+".join(languages), 'cuda' if gpu else 'cpu', "easyocr")
+
+    def loader():
+        import easyocr
+        return easyocr.Reader(list(languages), gpu=gpu, verbose=False)
+
+    return _load_once(key, loader)
+
+
+def load_report():
+    """{(path, device, backend): {"load_s": ..., "warmup_s": ...}} for every loaded model"""
+    return dict(_load_times)
@@ -0,0 +1,89 @@
+"""
+Motion Gate Module
+Skip detection on static frames (downscaled frame differencing / MOG2)
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Decide per frame whether a full YOLO pass is needed.
+
+    The frame is downscaled to `width` px grayscale and compared with the
+    frame of the last detection pass (method="diff") or fed to a MOG2
+    background subtractor (method="mog2"). When the changed-pixel ratio
+    reaches motion_ratio, the gate opens immediately and stays open for
+    hold_frames frames. A detection pass is also forced every max_skip
+    frames so trackers never go stale.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, motion_ratio=0.002,
+                 hold_frames=15, max_skip=30, method="diff"):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.hold_frames = hold_frames
+        self.max_skip = max_skip
+        self.method = method
+        self.subtractor = (
+            cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=16, detectShadows=False)
+            if method == "mog2" else None
+        )
+        self.reference = None
+        self.hold = 0
+        self.since_infer = 0
+        self.frames = 0
+        self.inferred = 0
+        self.gate_time = 0.0
+        self.last_ratio = 0.0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _changed_ratio(self, gray):
+        if self.subtractor is not None:
+            foreground = self.subtractor.apply(gray)
+            return np.count_nonzero(foreground) / foreground.size
+        if self.reference is None:
+            return 1.0
+        diff = cv2.absdiff(gray, self.reference)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def should_infer(self, frame):
+        """True if this frame needs a detection pass"""
+        start = time.perf_counter()
+        gray = self._small_gray(frame)
+        self.last_ratio = self._changed_ratio(gray)
+
+        if self.last_ratio >= self.motion_ratio:
+            self.hold = self.hold_frames
+        infer = self.hold > 0 or self.since_infer >= self.max_skip
+        self.hold = max(self.hold - 1, 0)
+
+        self.frames += 1
+        if infer:
+            self.inferred += 1
+            self.since_infer = 0
+            self.reference = gray
+        else:
+            self.since_infer += 1
+        self.gate_time += time.perf_counter() - start
+        return infer
+
+    def stats(self):
+        skipped = self.frames - self.inferred
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": skipped,
+            "skip_ratio": skipped / self.frames if self.frames else 0.0,
+            "gate_ms_per_frame": 1000 * self.gate_time / self.frames if self.frames else 0.0,
+        }
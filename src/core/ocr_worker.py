@@ -0,0 +1,144 @@
+"""
+OCR Worker Module
+EasyOCR in a process pool so plate detection never waits on OCR
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.plate_ocr import PlateRecognizer, readtext_best
+
+OcrResult = namedtuple("OcrResult", ["key", "text", "conf", "ocr_s", "latency_s", "meta"])
+
+# EasyOCR reader of the current worker process
+_reader = None
+_recognizer = None
+
+
+def _init_worker(languages, gpu, mode):
+    global _reader, _recognizer
+    import easyocr
+    _reader = easyocr.Reader(list(languages), gpu=gpu, verbose=False)
+    _recognizer = PlateRecognizer(_reader) if mode == "recognize" else None
+
+
+def _run_ocr(crops):
+    """Runs in a worker process: [(text, conf)] for plate crops + OCR time"""
+    start = time.perf_counter()
+    if _recognizer is not None:
+        reads = _recognizer.read_batch(crops)
+    else:
+        reads = [readtext_best(_reader, crop) for crop in crops]
+    return reads, time.perf_counter() - start
+
+
+class OcrWorkerPool:
+    """
+    Process pool for plate OCR (EasyOCR holds the GIL for long stretches on CPU).
+
+    submit() / submit_batch() hand crops to a worker and return
+    immediately; new work is refused (and counted as dropped) once
+    max_pending crops are in flight. A batch is read in one recognizer call.
+    Finished reads are collected with poll() from the detection loop;
+    drain() waits for the reads still in flight (end of stream).
+    mode: "recognize" (recognition only, PlateRecognizer) or "readtext".
+    """
+
+    def __init__(self, workers=2, max_pending=None, languages=('en',), gpu=False, mode="recognize"):
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(tuple(languages), gpu, mode),
+        )
+        self.max_pending = max_pending or workers * 2
+        self._done = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.ocr_total = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def submit(self, crop, key=None, meta=None):
+        """Queue a crop for OCR; False if the pool is saturated"""
+        return self.submit_batch([crop], [key], [meta]) == 1
+
+    def submit_batch(self, crops, keys=None, metas=None):
+        """Queue crops for one batched OCR call; returns how many were accepted (a prefix)"""
+        keys = keys or [None] * len(crops)
+        metas = metas or [None] * len(crops)
+        with self._lock:
+            accepted = max(min(len(crops), self.max_pending - self.pending), 0)
+            self.dropped += len(crops) - accepted
+            self.pending += accepted
+            self.submitted += accepted
+        if not accepted:
+            return 0
+
+        submitted_at = time.perf_counter()
+        future = self.executor.submit(_run_ocr, list(crops[:accepted]))
+        future.add_done_callback(
+            lambda f: self._on_done(f, keys[:accepted], metas[:accepted], submitted_at))
+        return accepted
+
+    def _on_done(self, future, keys, metas, submitted_at):
+        latency = time.perf_counter() - submitted_at
+        with self._lock:
+            self.pending -= len(keys)
+            if not self.pending:
+                self._idle.notify_all()
+            if future.cancelled():
+                return
+            try:
+                reads, ocr_s = future.result()
+            except Exception:
+                self.failed += len(keys)
+                return
+            ocr_s /= len(keys)
+            self.completed += len(keys)
+            self.ocr_total += ocr_s * len(keys)
+            self.latency_total += latency * len(keys)
+            self.latency_max = max(self.latency_max, latency)
+        for key, meta, (text, conf) in zip(keys, metas, reads):
+            self._done.put(OcrResult(key, text, conf, ocr_s, latency, meta))
+
+    def poll(self):
+        """All OCR results finished since the last poll (non-blocking)"""
+        results = []
+        while True:
+            try:
+                results.append(self._done.get_nowait())
+            except queue.Empty:
+                return results
+
+    def stats(self):
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "queue_depth": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "ocr_ms": 1000 * self.ocr_total / done,
+                "latency_avg_ms": 1000 * self.latency_total / done,
+                "latency_max_ms": 1000 * self.latency_max,
+            }
+
+    def drain(self, timeout=10.0):
+        """Wait until every submitted crop is read (results go to poll()); False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.pending, timeout)
+
+    def shutdown(self):
+        """Stop the workers; reads still in flight are cancelled (drain() first to keep them)"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,342 @@
+"""
+Outbox Module
+Durable SQLite write-ahead log for Realtime Database updates, drained in
+batches by a background sender with retry/backoff and replay on startup
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from src.core.storage import combine_writes
+
+
+def merge_update(batch, path, value):
+    """
+    Add path = value to a multi-path update dict, in write order.
+    The Realtime Database rejects overlapping paths in one update, so a
+    child of a path already in the batch is merged into that value and a
+    parent replaces the children it covers. Increments to the same path
+    are summed instead of the later one winning.
+    """
+    for existing in list(batch):
+        if path == existing:
+            batch[path] = combine_writes(batch[path], value)
+            return
+        if path.startswith(existing + "/"):
+            node = batch[existing] if isinstance(batch[existing], dict) else {}
+            batch[existing] = node
+            *parents, leaf = path[len(existing) + 1:].split("/")
+            for key in parents:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            node[leaf] = combine_writes(node.get(leaf), value)
+            return
+        if existing.startswith(path + "/"):
+            del batch[existing]
+    batch[path] = value
+
+
+def is_client_error(error):
+    """
+    True when the database rejected the request itself (HTTP 4xx: invalid
+    key, rules, payload), which a retry will not fix. Timeouts and rate
+    limits (408, 429) are left to the retry loop.
+    """
+    status = getattr(getattr(error, "http_response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+class WriteAheadLog:
+    """
+    Durable outbox for Realtime Database writes, applied exactly once.
+
+    append() commits one multi-path update ({path: value}) to SQLite as a
+    single row before returning, so an update is never split. A background
+    thread sends the oldest rows, batch_size at a time, as one multi-path
+    update through `sender` and deletes them only once it succeeded.
+    Failures are retried with exponential backoff (retry_min .. retry_max
+    seconds). Rows left by an earlier run (crash, network down at shutdown)
+    are replayed as soon as start() is called.
+
+    Every batch also writes a receipt per row under
+    receipts/<YYYY-MM-DD>/<row key>, in the same (atomic) update. When a
+    send may have been applied without the reply arriving (timeout, server
+    error, restart), the next attempt first looks the receipts up through
+    `lookup(path, start_key, end_key)` and drops the rows already applied,
+    so increments are not counted twice. Receipt days older than every
+    pending row are deleted as sending goes on.
+
+    A batch the database keeps rejecting (client error, max_client_failures
+    times) is retried one row at a time; a single row that keeps failing
+    moves to the dead_letter table so the rows behind it are not blocked.
+    """
+
+    def __init__(self, path, sender, batch_size=200, retry_min=1.0, retry_max=60.0, idle_wait=1.0,
+                 max_client_failures=3, lookup=None, receipts="outbox_receipts"):
+        self.path = str(path)
+        self.sender = sender
+        self.batch_size = batch_size
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self.idle_wait = idle_wait
+        self.max_client_failures = max_client_failures
+        self.lookup = lookup
+        self.receipts = receipts
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._migrate_path_rows()
+        self._create_tables()
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.appended = 0
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error = None
+        self.send_total = 0.0
+        self.dead_lettered = 0
+        self.already_applied = 0
+        # Consecutive client errors, and the last row id to retry one at a time
+        self._client_failures = 0
+        self._isolate_until = 0
+        # A send may have been applied without a reply: check receipts first (also on replay)
+        self._unsure = True
+
+    def _create_tables(self):
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, updates TEXT NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL, updates TEXT NOT NULL, created REAL NOT NULL, "
+            "failed REAL NOT NULL, error TEXT)"
+        )
+        # Days with receipts on the server, deleted once no pending row is from that day
+        self._conn.execute("CREATE TABLE IF NOT EXISTS receipt_days (day TEXT PRIMARY KEY)")
+
+    def _migrate_path_rows(self):
+        """Outbox files with one row per path (path, value): each row becomes a one-path update"""
+        for table in ("outbox", "dead_letter"):
+            columns = [c[1] for c in self._conn.execute(f"PRAGMA table_info({table})")]
+            if "path" not in columns:
+                continue
+            rows = self._conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+            with self._conn:
+                self._conn.execute(f"ALTER TABLE {table} RENAME TO {table}_by_path")
+            self._create_tables()
+            keep = [c for c in columns if c not in ("path", "value")]
+            names = ", ".join(["key", "updates"] + keep)
+            marks = ", ".join("?" * (len(keep) + 2))
+            with self._conn:
+                for row in rows:
+                    row = dict(zip(columns, row))
+                    updates = json.dumps({row["path"]: json.loads(row["value"])})
+                    self._conn.execute(f"INSERT INTO {table} ({names}) VALUES ({marks})",
+                                       [self._row_key(row["created"]), updates] + [row[c] for c in keep])
+                self._conn.execute(f"DROP TABLE {table}_by_path")
+
+    @staticmethod
+    def _row_key(created):
+        """Unique, time-ordered Realtime Database key"""
+        return f"{int(created * 1e6):017d}{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def _day(created):
+        return time.strftime("%Y-%m-%d", time.localtime(created))
+
+    def append(self, updates):
+        """Persist one multi-path update as one row; it is sent by the background thread"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO outbox (key, updates, created) VALUES (?, ?, ?)",
+                (self._row_key(now), json.dumps(updates), now),
+            )
+            self.appended += 1
+        self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def dead_letters(self):
+        """Updates given up on: [(updates, error), ...] oldest first"""
+        with self._lock:
+            rows = self._conn.execute("SELECT updates, error FROM dead_letter ORDER BY id").fetchall()
+        return [(json.loads(updates), error) for updates, error in rows]
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="FirebaseOutbox")
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the sender; unsent rows stay on disk for the next start()"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def flush(self, timeout=10.0):
+        """Wait until everything appended so far was sent; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self.pending():
+            if time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.05)
+        return True
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                sent = self.drain_once()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logging.debug(f"Firebase outbox send error: {e}")
+                delay = min(max(delay * 2, self.retry_min), self.retry_max)
+                self._stop.wait(delay)
+                continue
+            delay = 0.0
+            if sent < self.batch_size:
+                self._wake.wait(self.idle_wait)
+
+    def _delete(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def _drop_applied(self, rows):
+        """Rows whose receipt is already on the server are deleted; returns the others"""
+        if self.lookup is None:
+            return rows
+        applied = set()
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(self._day(row[3]), []).append(row[1])
+        for day, keys in by_day.items():
+            applied.update(self.lookup(f"{self.receipts}/{day}", min(keys), max(keys)) or {})
+        done = [row[0] for row in rows if row[1] in applied]
+        if done:
+            self._delete(done)
+            self.already_applied += len(done)
+        return [row for row in rows if row[1] not in applied]
+
+    def _receipt_updates(self, rows):
+        """Receipts of the batch, and deletes of receipt days older than every pending row"""
+        days = {self._day(created) for _, _, _, created in rows}
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO receipt_days (day) VALUES (?)", [(d,) for d in days])
+            expired = [day for (day,) in self._conn.execute(
+                "SELECT day FROM receipt_days WHERE day < ?", (self._day(rows[0][3]),)
+            )]
+        updates = {f"{self.receipts}/{day}": None for day in expired}
+        for _, key, _, created in rows:
+            updates[f"{self.receipts}/{self._day(created)}/{key}"] = True
+        return updates, expired
+
+    def drain_once(self):
+        """Send the oldest batch; returns the number of rows sent (or dead-lettered / already applied)"""
+        with self._lock:
+            head = self._conn.execute("SELECT MIN(id) FROM outbox").fetchone()[0]
+            limit = 1 if head is not None and head <= self._isolate_until else self.batch_size
+            rows = self._conn.execute(
+                "SELECT id, key, updates, created FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        if not rows:
+            return 0
+
+        if self._unsure:
+            unsent = self._drop_applied(rows)
+            self._unsure = False
+            if len(unsent) < len(rows):
+                return len(rows) - len(unsent)
+
+        batch = {}
+        for _, _, updates, _ in rows:
+            for path, value in json.loads(updates).items():
+                merge_update(batch, path, value)
+        receipts, expired = self._receipt_updates(rows)
+        batch.update(receipts)
+
+        start = time.perf_counter()
+        try:
+            self.sender(batch)
+        except Exception as e:
+            if not is_client_error(e):
+                self._unsure = True
+                raise
+            self._client_failures += 1
+            if self._client_failures < self.max_client_failures:
+                raise
+            self._client_failures = 0
+            if len(rows) > 1:
+                # find the rejected row(s): retry this batch one row at a time
+                self._isolate_until = rows[-1][0]
+                raise
+            self._dead_letter(rows[0], e)
+            return 1
+        self.send_total += time.perf_counter() - start
+        self._client_failures = 0
+
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row[0],) for row in rows])
+            self._conn.executemany("DELETE FROM receipt_days WHERE day = ?", [(day,) for day in expired])
+        self.sent += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    def _dead_letter(self, row, error):
+        row_id, _, updates, _ = row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO dead_letter (id, key, updates, created, failed, error) "
+                "SELECT id, key, updates, created, ?, ? FROM outbox WHERE id = ?",
+                (time.time(), str(error), row_id),
+            )
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+        self.dead_lettered += 1
+        logging.error(f"Firebase outbox: gave up on update {sorted(json.loads(updates))} after "
+                      f"{self.max_client_failures} rejected sends ({error})")
+
+    def stats(self):
+        return {
+            "appended": self.appended,
+            "sent": self.sent,
+            "batches": self.batches,
+            "pending": self.pending(),
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "dead_lettered": self.dead_lettered,
+            "already_applied": self.already_applied,
+            "send_ms_avg": 1000 * self.send_total / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
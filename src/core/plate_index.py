@@ -0,0 +1,122 @@
+"""
+Plate Index Module
+Normalize / validate Vietnamese plates and collapse OCR near-duplicates
+of the plate being loaded
+"""
+
+import re
+import time
+
+# Letters used in plate series (as in plate_ocr.PLATE_ALLOWLIST: no I, J, O, Q, W)
+SERIES_LETTERS = "ABCDEFGHKLMNPRSTUVXYZ"
+
+# <2-digit province><series: letter + optional series letter/digit>-<4-5 digits>
+PLATE_PATTERN = re.compile(rf"^\d{{2}}[A-Z][{SERIES_LETTERS}0-9]?-\d{{4,5}}$")
+
+# OCR confusions, fixed where the format says digit / letter
+TO_DIGIT = str.maketrans("OQDIJLZSBGT", "00011125867")
+TO_LETTER = str.maketrans("0125864", "DIZSBGA")
+
+
+def _format_plate(chars, head):
+    """"<head chars>-<rest>" with digit / letter confusions fixed per position"""
+    series = chars[2].translate(TO_LETTER)
+    if head == 4:
+        fourth = chars[3]
+        series += fourth if fourth in SERIES_LETTERS else fourth.translate(TO_DIGIT)
+    return chars[:2].translate(TO_DIGIT) + series + "-" + chars[head:].translate(TO_DIGIT)
+
+
+def normalize_plate(text):
+    """
+    Canonical plate "65C-06855" from an OCR read, or None if the read does
+    not fit the Vietnamese format.
+    """
+    chars = "".join(c for c in (text or "").upper() if c.isalnum())
+    if not 7 <= len(chars) <= 9:
+        return None
+    # 7: 51A-1234 | 8: 65C-06855 or 51LD-1234 | 9: 59F1-12345
+    # The 4th character only opens a 2-letter series if it is a series letter,
+    # so "65C-O6855" is 65C-06855 read with O for 0, not series "CO"
+    heads = (4, 3) if len(chars) == 9 or chars[3] in SERIES_LETTERS else (3, 4)
+    for head in heads:
+        plate = _format_plate(chars, head)
+        if PLATE_PATTERN.match(plate):
+            return plate
+    return None
+
+
+def edit_distance(a, b):
+    """Levenshtein distance"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class PlateDeduplicator:
+    """
+    Turn finalized plate reads into plate switches.
+
+    A read is normalized and validated first (invalid -> None). A read
+    within max_distance edits of the current plate is OCR jitter and maps
+    to it. Any other plate becomes the current one; it is a new visit
+    unless the same plate was seen in the last `window` seconds (a truck
+    coming back after another one drove past), in which case its record
+    is reused.
+    """
+
+    def __init__(self, max_distance=1, window=300.0, clock=time.monotonic):
+        self.max_distance = max_distance
+        self.window = window
+        self.clock = clock
+        self.current = None
+        self.last_seen = {}
+        self.reads = 0
+        self.invalid = 0
+        self.merged = 0
+        self.revisits = 0
+
+    def canonical(self, text):
+        """
+        (plate, switched, new_visit): switched when plate is not the current
+        plate (the caller switches to it); (None, False, False) for reads
+        that are not a valid plate
+        """
+        self.reads += 1
+        plate = normalize_plate(text)
+        if plate is None:
+            self.invalid += 1
+            return None, False, False
+
+        now = self.clock()
+        switched = new_visit = False
+        if self.current is not None and edit_distance(plate, self.current) <= self.max_distance:
+            self.merged += plate != self.current
+            plate = self.current
+        else:
+            seen = self.last_seen.get(plate)
+            switched, new_visit = True, seen is None or now - seen > self.window
+            self.revisits += not new_visit
+            self.current = plate
+        self.last_seen[plate] = now
+        self._evict(now - self.window)
+        return plate, switched, new_visit
+
+    def _evict(self, since):
+        if len(self.last_seen) > 64:
+            self.last_seen = {p: t for p, t in self.last_seen.items() if t >= since}
+
+    def stats(self):
+        return {
+            "reads": self.reads,
+            "invalid": self.invalid,
+            "merged": self.merged,
+            "revisits": self.revisits,
+            "recent_plates": len(self.last_seen),
+        }
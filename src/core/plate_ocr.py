@@ -0,0 +1,97 @@
+"""
+Plate OCR Module
+Recognition-only EasyOCR on YOLO plate crops (skips the CRAFT text detector)
+"""
+
+import cv2
+import numpy as np
+
+# Characters used on Vietnamese plates (no I, J, O, Q, W)
+PLATE_ALLOWLIST = "0123456789ABCDEFGHKLMNPRSTUVXYZ-."
+# Crops narrower than this (w / h) are read as two-line plates
+TWO_LINE_ASPECT = 3.0
+# Vertical gap (px) between crops stacked into one batch image
+BATCH_GAP = 8
+
+
+def to_gray(crop):
+    return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+
+
+def line_regions(gray):
+    """
+    Text lines of a plate crop as [x_min, x_max, y_min, y_max].
+    Long plates are one line; square-ish plates are split in two at the row
+    with the fewest text pixels in the middle band.
+    """
+    h, w = gray.shape
+    if w / h >= TWO_LINE_ASPECT or h < 8:
+        return [[0, w, 0, h]]
+    _, text = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    top, bottom = int(h * 0.35), int(h * 0.65)
+    split = top + int(np.argmin(text[top:bottom].sum(axis=1)))
+    return [[0, w, 0, split], [0, w, split, h]]
+
+
+def join_lines(reads):
+    """(text, conf) of one plate from its line reads, top to bottom"""
+    if not any(text for text, _ in reads):
+        return None, 0.0
+    text = "".join(text for text, _ in reads)
+    return text, float(np.mean([conf for _, conf in reads]))
+
+
+def readtext_best(reader, crop):
+    """Full EasyOCR pass (CRAFT detection + recognition): best (text, conf)"""
+    results = reader.readtext(crop)
+    if not results:
+        return None, 0.0
+    best = max(results, key=lambda x: x[2])
+    return best[1], float(best[2])
+
+
+class PlateRecognizer:
+    """
+    Read plate crops with EasyOCR's recognizer only.
+
+    YOLO crops are already tight, so readtext's text detection pass is
+    redundant: each crop is split into its 1 or 2 text lines and fed to
+    reader.recognize with a plate-character allowlist. read_batch stacks
+    several crops into one image, so all their lines go through a single
+    recognizer call.
+    """
+
+    def __init__(self, reader, allowlist=PLATE_ALLOWLIST):
+        self.reader = reader
+        self.allowlist = allowlist
+
+    def read(self, crop):
+        return self.read_batch([crop])[0]
+
+    def read_batch(self, crops):
+        """[(text, conf)] for each crop, in order"""
+        grays = [to_gray(crop) for crop in crops]
+        width = max(gray.shape[1] for gray in grays)
+        height = sum(gray.shape[0] for gray in grays) + BATCH_GAP * (len(grays) - 1)
+        canvas = np.zeros((height, width), np.uint8)
+
+        regions, owner = [], {}
+        y = 0
+        for i, gray in enumerate(grays):
+            h, w = gray.shape
+            canvas[y:y + h, :w] = gray
+            for x_min, x_max, y_min, y_max in line_regions(gray):
+                regions.append([x_min, x_max, y + y_min, y + y_max])
+                owner[y + y_min] = i
+            y += h + BATCH_GAP
+
+        results = self.reader.recognize(
+            canvas, horizontal_list=regions, free_list=[],
+            allowlist=self.allowlist, batch_size=len(regions), detail=1,
+        )
+
+        # Regions come back with their box; map them to crops by top edge
+        lines = [[] for _ in crops]
+        for box, text, conf in sorted(results, key=lambda r: r[0][0][1]):
+            lines[owner[int(box[0][1])]].append((text, float(conf)))
+        return [join_lines(reads) for reads in lines]
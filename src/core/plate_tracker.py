@@ -0,0 +1,217 @@
+"""
+Plate Tracker Module
+Per-track OCR cache: crop quality ranking + confidence-weighted character voting
+"""
+
+import heapq
+import itertools
+import math
+from collections import defaultdict
+
+import cv2
+
+# Vietnamese plates: 1-line 520x110 mm, 2-line 330x165 mm
+PLATE_ASPECTS = (4.7, 2.0)
+# Laplacian variance at which sharpness scores 0.5
+SHARPNESS_REF = 100.0
+# Crop height (px) that counts as full size
+FULL_HEIGHT = 40
+
+
+def crop_quality(crop, box, frame_shape, min_height=12, edge_margin=2):
+    """
+    Cheap 0..1 quality score of a plate crop:
+    sharpness (Laplacian variance) x size x aspect ratio x frame-edge penalty.
+    box is (x1, y1, x2, y2) in frame coordinates.
+    """
+    h, w = crop.shape[:2]
+    if h < min_height or w < min_height:
+        return 0.0
+
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+    sharpness = variance / (variance + SHARPNESS_REF)
+
+    size = min(h / FULL_HEIGHT, 1.0)
+
+    aspect_error = min(abs(math.log(w / h / r)) for r in PLATE_ASPECTS)
+    aspect = math.exp(-aspect_error / 0.35)
+
+    x1, y1, x2, y2 = box
+    frame_h, frame_w = frame_shape[:2]
+    cut = (x1 <= edge_margin or y1 <= edge_margin
+           or x2 >= frame_w - edge_margin or y2 >= frame_h - edge_margin)
+    edge = 0.3 if cut else 1.0
+
+    return sharpness * size * aspect * edge
+
+
+def clean_plate_text(text):
+    """Uppercase, keep only letters/digits/'-'/'.'"""
+    return "".join(c for c in text.upper() if c.isalnum() or c in "-.")
+
+
+def vote_plate(reads):
+    """
+    Combine several OCR reads of one plate.
+    reads: [(text, conf)]. The string length is chosen by summed confidence,
+    then each position takes the character with the highest summed
+    confidence among reads of that length.
+    Returns (text, score) with score = mean winning weight share, or (None, 0.0).
+    """
+    reads = [(clean_plate_text(t), c) for t, c in reads if t]
+    reads = [(t, c) for t, c in reads if t]
+    if not reads:
+        return None, 0.0
+
+    length_weight = defaultdict(float)
+    for text, conf in reads:
+        length_weight[len(text)] += conf
+    length = max(length_weight, key=length_weight.get)
+    aligned = [(t, c) for t, c in reads if len(t) == length]
+    total = sum(c for _, c in aligned) or 1.0
+
+    chars, shares = [], []
+    for i in range(length):
+        weights = defaultdict(float)
+        for text, conf in aligned:
+            weights[text[i]] += conf
+        char = max(weights, key=weights.get)
+        chars.append(char)
+        shares.append(weights[char] / total)
+    return "".join(chars), sum(shares) / length
+
+
+class PlateTrack:
+    """OCR state of one tracked plate"""
+
+    def __init__(self, track_id, frame_index):
+        self.track_id = track_id
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.reads = []
+        self.candidates = []  # min-heap of (score, seq, crop), top-K by quality
+        self.last_submit = frame_index
+        self.submitted = 0
+        self.pending = 0
+        self.emitted = False
+
+    @property
+    def text(self):
+        return vote_plate(self.reads)[0]
+
+
+class PlateTrackCache:
+    """
+    OCR cache keyed by tracker ID.
+
+    Crops are offered with a quality score; each track keeps its top_k
+    crops. Every settle_frames frames (and once more when the track is
+    lost) the best buffered crop is handed out for OCR, at most max_reads
+    times per track. Its plate is emitted once: as soon as max_reads reads
+    are in, or when the track has been gone for lost_frames frames with at
+    least one read.
+    """
+
+    def __init__(self, max_reads=3, lost_frames=30, top_k=3, settle_frames=5):
+        self.max_reads = max_reads
+        self.lost_frames = lost_frames
+        self.top_k = top_k
+        self.settle_frames = settle_frames
+        self.tracks = {}
+        self._seq = itertools.count()
+        self.crops_offered = 0
+        self.ocr_calls = 0
+        self.quality_total = 0.0
+        self.emitted = 0
+
+    def seen(self, track_id, frame_index):
+        track = self.tracks.get(track_id)
+        if track is None:
+            track = self.tracks[track_id] = PlateTrack(track_id, frame_index)
+        track.last_seen = frame_index
+        return track
+
+    def needs_ocr(self, track_id):
+        track = self.tracks.get(track_id)
+        return track is not None and not track.emitted and track.submitted < self.max_reads
+
+    def offer(self, track_id, crop, score):
+        """Buffer a crop if it is among the track's top_k (copied only if kept)"""
+        track = self.tracks[track_id]
+        self.crops_offered += 1
+        if score <= 0.0:
+            return
+        if len(track.candidates) < self.top_k:
+            heapq.heappush(track.candidates, (score, next(self._seq), crop.copy()))
+        elif score > track.candidates[0][0]:
+            heapq.heapreplace(track.candidates, (score, next(self._seq), crop.copy()))
+
+    def due(self, frame_index):
+        """[(track_id, crop)]: best buffered crop of every track due for OCR"""
+        ready = []
+        for track_id, track in self.tracks.items():
+            if not track.candidates or not self.needs_ocr(track_id):
+                continue
+            lost = frame_index - track.last_seen > self.lost_frames
+            if lost or frame_index - track.last_submit >= self.settle_frames:
+                ready.append((track_id, max(track.candidates)[2]))
+        return ready
+
+    def mark_submitted(self, track_id, frame_index=None):
+        """The best buffered crop was accepted by the OCR pool"""
+        track = self.tracks[track_id]
+        if track.candidates:
+            best = max(track.candidates)
+            track.candidates.remove(best)
+            heapq.heapify(track.candidates)
+            self.quality_total += best[0]
+        if frame_index is not None:
+            track.last_submit = frame_index
+        track.submitted += 1
+        track.pending += 1
+        self.ocr_calls += 1
+
+    def add_read(self, track_id, text, conf):
+        track = self.tracks.get(track_id)
+        if track is None:
+            return
+        track.pending = max(track.pending - 1, 0)
+        if text:
+            track.reads.append((text, conf))
+
+    def label(self, track_id):
+        track = self.tracks.get(track_id)
+        text = track.text if track else None
+        return text or "..."
+
+    def finalize(self, frame_index, flush=False):
+        """
+        [(track_id, plate)] ready to emit; forgets tracks that are done.
+        flush=True (end of stream): every track is finished, no read is
+        waited for any more.
+        """
+        ready = []
+        for track_id, track in list(self.tracks.items()):
+            lost = flush or frame_index - track.last_seen > self.lost_frames
+            waiting = not flush and (track.pending or (track.candidates and self.needs_ocr(track_id)))
+            complete = len(track.reads) >= self.max_reads or (lost and not waiting)
+            if not track.emitted and complete and track.reads:
+                track.emitted = True
+                self.emitted += 1
+                ready.append((track_id, track.text))
+            # pending reads may never arrive if a worker failed
+            gone = frame_index - track.last_seen > 4 * self.lost_frames
+            if lost and (not waiting or gone):
+                del self.tracks[track_id]
+        return ready
+
+    def stats(self):
+        return {
+            "active_tracks": len(self.tracks),
+            "crops_offered": self.crops_offered,
+            "ocr_calls": self.ocr_calls,
+            "quality_avg": self.quality_total / self.ocr_calls if self.ocr_calls else 0.0,
+            "plates_emitted": self.emitted,
+            "ocr_per_plate": self.ocr_calls / self.emitted if self.emitted else 0.0,
+        }
@@ -0,0 +1,111 @@
+"""
+ROI Module
+Vectorized centroid / ROI membership for tracked boxes
+"""
+
+import cv2
+import numpy as np
+
+# Pixel offsets of a filled radius-4 disc, used to stamp centroids in one go
+_DISC_RADIUS = 4
+_dy, _dx = np.mgrid[-_DISC_RADIUS:_DISC_RADIUS + 1, -_DISC_RADIUS:_DISC_RADIUS + 1]
+_disc = _dy ** 2 + _dx ** 2 <= _DISC_RADIUS ** 2
+DISC_DY, DISC_DX = _dy[_disc], _dx[_disc]
+
+
+class RoiSet:
+    """
+    Named ROI polygons for one camera.
+
+    The polygons are rasterized once per frame size into a single int32
+    label mask (bit i set = pixel inside ROI i), so membership for all
+    centroids and all ROIs is a single fancy-indexing lookup.
+    """
+
+    MAX_ROIS = 31
+
+    def __init__(self, regions):
+        if not regions:
+            raise ValueError("RoiSet needs at least one region")
+        if len(regions) > self.MAX_ROIS:
+            raise ValueError(f"RoiSet supports at most {self.MAX_ROIS} regions")
+
+        self.names = list(regions)
+        self.polygons = [
+            np.asarray(points, np.int32).reshape((-1, 1, 2))
+            for points in regions.values()
+        ]
+        self._bits = np.arange(len(self.names), dtype=np.int32)
+        self._mask = None
+        self._shape = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def bounding_rect(self, shape, padding=0):
+        """Padded (x0, y0, x1, y1) rectangle around all ROIs, clipped to the frame"""
+        h, w = shape[:2]
+        points = np.concatenate(self.polygons).reshape(-1, 2)
+        x0, y0 = points.min(axis=0) - padding
+        x1, y1 = points.max(axis=0) + padding + 1
+        return max(int(x0), 0), max(int(y0), 0), min(int(x1), w), min(int(y1), h)
+
+    def near(self, points, shape, padding=0):
+        """True if any point lies inside the padded ROI bounding rectangle"""
+        if len(points) == 0:
+            return False
+        x0, y0, x1, y1 = self.bounding_rect(shape, padding)
+        px, py = points[:, 0], points[:, 1]
+        return bool(np.any((px >= x0) & (px < x1) & (py >= y0) & (py < y1)))
+
+    def mask(self, shape):
+        """Label mask for a frame of the given shape (cached per resolution)"""
+        h, w = shape[:2]
+        if self._shape != (h, w):
+            mask = np.zeros((h, w), np.int32)
+            layer = np.empty((h, w), np.uint8)
+            for i, polygon in enumerate(self.polygons):
+                layer.fill(0)
+                cv2.fillPoly(layer, [polygon], 1)
+                mask |= layer.astype(np.int32) << i
+            self._mask = mask
+            self._shape = (h, w)
+        return self._mask
+
+    def membership(self, centroids, shape):
+        """
+        Boolean (n_points, n_rois) matrix: centroid i is inside ROI j.
+        Points outside the frame are outside every ROI.
+        """
+        n = len(centroids)
+        if n == 0:
+            return np.zeros((0, len(self.names)), bool)
+
+        mask = self.mask(shape)
+        h, w = mask.shape
+        cx, cy = centroids[:, 0], centroids[:, 1]
+        valid = (cx >= 0) & (cx < w) & (cy >= 0) & (cy < h)
+
+        labels = np.zeros(n, np.int32)
+        labels[valid] = mask[cy[valid], cx[valid]]
+        return ((labels[:, None] >> self._bits) & 1).astype(bool)
+
+
+def box_centroids(xyxy):
+    """Integer centroids (N, 2) for an (N, 4) array of xyxy boxes"""
+    xyxy = np.asarray(xyxy, np.float32).reshape(-1, 4)
+    cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+    cy = (xyxy[:, 1] + xyxy[:, 3]) / 2
+    return np.stack([cx, cy], axis=1).astype(np.int32)
+
+
+def draw_centroids(frame, centroids, color=(0, 255, 0)):
+    """Stamp a filled disc on every centroid with one indexed assignment"""
+    if len(centroids) == 0:
+        return frame
+    h, w = frame.shape[:2]
+    ys = (centroids[:, 1:2] + DISC_DY).ravel()
+    xs = (centroids[:, 0:1] + DISC_DX).ravel()
+    keep = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    frame[ys[keep], xs[keep]] = color
+    return frame
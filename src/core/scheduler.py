@@ -0,0 +1,81 @@
+"""
+Frame Scheduler Module
+Adaptive frame stride to hold a target processing rate
+"""
+
+import math
+import time
+from collections import deque
+
+
+class FrameScheduler:
+    """
+    Choose which incoming frames a pipeline processes.
+
+    The stride is the larger of what target_fps allows
+    (source_fps / target_fps) and what the measured inference cost allows
+    while keeping up with the source (source_fps * cost). Cost is an
+    exponential moving average over processed frames. While an object is
+    near the ROI the stride drops to 1 (full rate) until it leaves.
+
+    cost_stride=False leaves out the cost term: for readers that already
+    drop the frames arriving during inference (live sources), skipping
+    more on top of that only lowers throughput.
+    """
+
+    def __init__(self, source_fps, target_fps=30, max_stride=8, smoothing=0.2, window=30,
+                 cost_stride=True):
+        self.source_fps = source_fps if source_fps and source_fps > 0 else target_fps
+        self.target_fps = target_fps
+        self.max_stride = max_stride
+        self.smoothing = smoothing
+        self.cost_stride = cost_stride
+        self.cost = None
+        self.stride = 1
+        self.full_rate = False
+        self._since_processed = 0
+        self._processed_times = deque(maxlen=window)
+        self.frames = 0
+        self.processed = 0
+
+    def should_process(self):
+        """Call once per incoming frame"""
+        self.frames += 1
+        self._since_processed += 1
+        if self.full_rate or self._since_processed >= self.stride:
+            self._since_processed = 0
+            self.processed += 1
+            self._processed_times.append(time.monotonic())
+            return True
+        return False
+
+    def record(self, cost, near_roi=False):
+        """Report the processing cost (seconds) of the frame just processed"""
+        self.cost = cost if self.cost is None else (
+            self.smoothing * cost + (1 - self.smoothing) * self.cost
+        )
+        self.full_rate = near_roi
+        target_stride = self.source_fps / self.target_fps if self.target_fps else 1
+        cost_stride = self.source_fps * self.cost if self.cost_stride else 1
+        self.stride = min(max(1, math.ceil(max(target_stride, cost_stride) - 1e-6)), self.max_stride)
+
+    @property
+    def current_stride(self):
+        return 1 if self.full_rate else self.stride
+
+    @property
+    def achieved_fps(self):
+        """Processed frames per second over the recent window"""
+        times = self._processed_times
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stats(self):
+        return {
+            "stride": self.current_stride,
+            "achieved_fps": self.achieved_fps,
+            "cost_ms": 1000 * self.cost if self.cost is not None else 0.0,
+            "frames": self.frames,
+            "processed": self.processed,
+        }
@@ -0,0 +1,367 @@
+"""
+Storage Module
+Realtime-Database-style storage (path-addressed JSON tree) with Firebase,
+in-memory and SQLite backends, selected by STORAGE_BACKEND in config/settings.py
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config.settings import FIREBASE_DB_URL, FIREBASE_KEY, STORAGE_BACKEND, STORAGE_SQLITE_PATH
+
+# Same fields as firebase_admin.db.Event
+Event = namedtuple("Event", ["event_type", "path", "data"])
+
+
+def split_path(path):
+    return [key for key in (path or "").strip("/").split("/") if key]
+
+
+def join_path(*parts):
+    return "/".join(key for part in parts for key in split_path(part))
+
+
+def prune(value):
+    """Drop None / empty dicts like the Realtime Database does"""
+    if not isinstance(value, dict):
+        return value
+    pruned = {k: prune(v) for k, v in value.items()}
+    pruned = {k: v for k, v in pruned.items() if v is not None and v != {}}
+    return pruned or None
+
+
+# ==============================
+# Server values ({".sv": {"increment": n}})
+# ==============================
+def increment(n):
+    """Realtime Database increment sentinel: the server adds n to the stored number"""
+    return {".sv": {"increment": n}}
+
+
+def is_increment(value):
+    return isinstance(value, dict) and isinstance(value.get(".sv"), dict) and "increment" in value[".sv"]
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def has_server_values(value):
+    if is_increment(value):
+        return True
+    return isinstance(value, dict) and any(has_server_values(v) for v in value.values())
+
+
+def resolve_server_values(value, current):
+    """
+    `value` with its increment sentinels applied to `current` (the stored
+    value at the same path), as the server does: a missing or non-numeric
+    value counts as 0.
+    """
+    if is_increment(value):
+        return (current if _is_number(current) else 0) + value[".sv"]["increment"]
+    if isinstance(value, dict):
+        current = current if isinstance(current, dict) else {}
+        return {k: resolve_server_values(v, current.get(k)) for k, v in value.items()}
+    return value
+
+
+def combine_writes(previous, value):
+    """
+    One write equivalent to writing `previous` then `value` to the same
+    path: increments are summed (or added to a pending number), anything
+    else replaces the earlier value.
+    """
+    if is_increment(value):
+        if is_increment(previous):
+            return increment(previous[".sv"]["increment"] + value[".sv"]["increment"])
+        if _is_number(previous):
+            return previous + value[".sv"]["increment"]
+    return value
+
+
+class Storage:
+    """
+    Path-addressed JSON tree, the subset of the Realtime Database API the
+    project uses:
+        get(path), set(path, value), update({path: value, ...}) (multi-path,
+        values may hold increment() sentinels),
+        query_range(path, start_key, end_key) (order_by_key().start_at().end_at()),
+        listen(path, callback) -> handle with close()
+        change_token() -> changes when another process wrote (None: listeners see everything)
+    """
+
+    def get(self, path=""):
+        raise NotImplementedError
+
+    def update(self, updates):
+        raise NotImplementedError
+
+    def set(self, path, value):
+        self.update({path: value})
+
+    def query_range(self, path, start_key, end_key):
+        children = self.get(path)
+        if not isinstance(children, dict):
+            return {}
+        return {k: v for k, v in sorted(children.items()) if start_key <= k <= end_key}
+
+    def listen(self, path, callback):
+        raise NotImplementedError
+
+    def change_token(self):
+        return None
+
+
+# ==============================
+# Firebase Realtime Database
+# ==============================
+class FirebaseStorage(Storage):
+    """firebase_admin backend; the app is initialized on first use, not at import"""
+
+    def __init__(self, key_path=FIREBASE_KEY, db_url=FIREBASE_DB_URL):
+        import firebase_admin
+        from firebase_admin import credentials, db
+
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(str(key_path)), {"databaseURL": db_url})
+        self.db = db
+
+    def _ref(self, path):
+        return self.db.reference("/" + join_path(path))
+
+    def get(self, path=""):
+        return self._ref(path).get()
+
+    def update(self, updates):
+        self._ref("").update(updates)
+
+    def query_range(self, path, start_key, end_key):
+        return self._ref(path).order_by_key().start_at(start_key).end_at(end_key).get() or {}
+
+    def listen(self, path, callback):
+        return self._ref(path).listen(callback)
+
+
+# ==============================
+# Local backends (in-process listeners)
+# ==============================
+class _Listener:
+    def __init__(self, owner, path, callback):
+        self.owner = owner
+        self.path = join_path(path)
+        self.callback = callback
+
+    def close(self):
+        with self.owner._listeners_lock:
+            if self in self.owner._listeners:
+                self.owner._listeners.remove(self)
+
+
+class LocalStorage(Storage):
+    """Shared listener plumbing: events are delivered synchronously after each update"""
+
+    def __init__(self):
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+
+    def listen(self, path, callback):
+        listener = _Listener(self, path, callback)
+        with self._listeners_lock:
+            self._listeners.append(listener)
+        callback(Event("put", "/", self.get(listener.path)))
+        return listener
+
+    def _notify(self, updates):
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            root = listener.path
+            for path in updates:
+                path = join_path(path)
+                if not root or path == root or path.startswith(root + "/"):
+                    relative = path[len(root):].strip("/")
+                    event = Event("put", "/" + relative, self.get(path))
+                elif root.startswith(path + "/"):
+                    event = Event("put", "/", self.get(root))
+                else:
+                    continue
+                try:
+                    listener.callback(event)
+                except Exception as e:
+                    logging.debug(f"Storage listener error: {e}")
+
+
+class MemoryStorage(LocalStorage):
+    """In-process JSON tree (tests, benchmarks, offline runs)"""
+
+    def __init__(self, data=None):
+        super().__init__()
+        self.data = prune(data) or {}
+        self._lock = threading.RLock()
+
+    def get(self, path=""):
+        with self._lock:
+            return json.loads(json.dumps(self._node(split_path(path))))
+
+    def _node(self, keys):
+        node = self.data
+        for key in keys:
+            if not isinstance(node, dict) or key not in node:
+                return None
+            node = node[key]
+        return node
+
+    def _set(self, keys, value):
+        if not keys:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        nodes = [self.data]
+        for key in keys[:-1]:
+            if not isinstance(nodes[-1].get(key), dict):
+                nodes[-1][key] = {}
+            nodes.append(nodes[-1][key])
+        if value is None:
+            nodes[-1].pop(keys[-1], None)
+            # drop parents left empty
+            for parent, key in zip(reversed(nodes[:-1]), reversed(keys[:-1])):
+                if parent[key]:
+                    break
+                del parent[key]
+        else:
+            nodes[-1][keys[-1]] = value
+
+    def update(self, updates):
+        with self._lock:
+            for path, value in updates.items():
+                keys = split_path(path)
+                if has_server_values(value):
+                    value = resolve_server_values(value, self._node(keys))
+                self._set(keys, prune(json.loads(json.dumps(value))))
+        self._notify(updates)
+
+
+class SqliteStorage(LocalStorage):
+    """
+    JSON tree persisted in SQLite, one row per leaf keyed by its full path.
+    A subtree is the key range [path/, path0) ('0' sorts right after '/').
+    Listeners only see this connection's writes; writes from other
+    processes show up as a new change_token() (PRAGMA data_version).
+    """
+
+    def __init__(self, path=STORAGE_SQLITE_PATH):
+        super().__init__()
+        directory = os.path.dirname(str(path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.RLock()
+
+    def _rows(self, path):
+        if not path:
+            return self._conn.execute("SELECT path, value FROM nodes").fetchall()
+        return self._conn.execute(
+            "SELECT path, value FROM nodes WHERE path = ? OR (path >= ? AND path < ?)",
+            (path, path + "/", path + "0"),
+        ).fetchall()
+
+    def get(self, path=""):
+        path = join_path(path)
+        with self._lock:
+            rows = self._rows(path)
+        tree = {}
+        for leaf, value in rows:
+            if leaf == path:
+                return json.loads(value)
+            node = tree
+            *parents, key = split_path(leaf[len(path):])
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[key] = json.loads(value)
+        return tree or None
+
+    @staticmethod
+    def _leaves(path, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                yield from SqliteStorage._leaves(join_path(path, key), child)
+        elif value is not None:
+            yield path, json.dumps(value)
+
+    def update(self, updates):
+        with self._lock, self._conn:
+            for path, value in updates.items():
+                path = join_path(path)
+                keys = split_path(path)
+                if has_server_values(value):
+                    value = resolve_server_values(value, self.get(path))
+                # a leaf stored at an ancestor would shadow the new subtree
+                for i in range(1, len(keys)):
+                    self._conn.execute("DELETE FROM nodes WHERE path = ?", ("/".join(keys[:i]),))
+                if path:
+                    self._conn.execute(
+                        "DELETE FROM nodes WHERE path = ? OR (path >= ? AND path < ?)",
+                        (path, path + "/", path + "0"),
+                    )
+                else:
+                    self._conn.execute("DELETE FROM nodes")
+                self._conn.executemany(
+                    "INSERT INTO nodes (path, value) VALUES (?, ?)", list(self._leaves(path, value))
+                )
+        self._notify(updates)
+
+    def change_token(self):
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def query_range(self, path, start_key, end_key):
+        base = join_path(path)
+        prefix = base + "/" if base else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, value FROM nodes WHERE path >= ? AND path < ?",
+                (prefix + start_key, prefix + end_key + "0"),
+            ).fetchall()
+        result = {}
+        for leaf, value in rows:
+            child, *rest = split_path(leaf[len(prefix):])
+            if not start_key <= child <= end_key:
+                continue
+            if not rest:
+                result[child] = json.loads(value)
+                continue
+            node = result.setdefault(child, {})
+            for key in rest[:-1]:
+                node = node.setdefault(key, {})
+            node[rest[-1]] = json.loads(value)
+        return result
+
+
+BACKENDS = {
+    "firebase": FirebaseStorage,
+    "memory": MemoryStorage,
+    "sqlite": SqliteStorage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Process-wide storage of the STORAGE_BACKEND type, created on first use"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected one of {sorted(BACKENDS)}")
+            _storage = BACKENDS[STORAGE_BACKEND]()
+        return _storage
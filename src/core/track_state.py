@@ -0,0 +1,80 @@
+"""
+Track State Module
+Bounded store of counted tracker IDs with time-based eviction
+"""
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class TrackStateStore:
+    """
+    Counted track IDs with a last-seen timestamp each.
+
+    IDs are kept in last-seen order (OrderedDict), so membership is O(1)
+    and eviction only looks at the oldest entries: an ID is dropped `ttl`
+    seconds after it was last seen in a frame.
+    """
+
+    def __init__(self, ttl=30.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._last_seen = OrderedDict()
+        self.added = 0
+        self.evicted = 0
+        self.peak_size = 0
+
+    def __contains__(self, track_id):
+        return int(track_id) in self._last_seen
+
+    def __len__(self):
+        return len(self._last_seen)
+
+    def contains_many(self, ids):
+        """Boolean array: which of ids are already stored"""
+        seen = self._last_seen
+        return np.fromiter((int(i) in seen for i in ids), bool, len(ids))
+
+    def add_many(self, ids, now=None):
+        """Store new IDs as seen now"""
+        now = self.clock() if now is None else now
+        for track_id in ids:
+            self._last_seen[int(track_id)] = now
+            self._last_seen.move_to_end(int(track_id))
+            self.added += 1
+        self.peak_size = max(self.peak_size, len(self._last_seen))
+
+    def touch(self, ids, now=None):
+        """Refresh last-seen time of stored IDs that appear in this frame"""
+        now = self.clock() if now is None else now
+        seen = self._last_seen
+        for track_id in ids:
+            track_id = int(track_id)
+            if track_id in seen:
+                seen[track_id] = now
+                seen.move_to_end(track_id)
+
+    def evict(self, now=None):
+        """Drop IDs not seen for more than ttl seconds; returns how many"""
+        now = self.clock() if now is None else now
+        seen = self._last_seen
+        count = 0
+        while seen:
+            track_id, last_seen = next(iter(seen.items()))
+            if now - last_seen <= self.ttl:
+                break
+            seen.popitem(last=False)
+            count += 1
+        self.evicted += count
+        return count
+
+    def stats(self):
+        return {
+            "size": len(self._last_seen),
+            "peak_size": self.peak_size,
+            "added": self.added,
+            "evicted": self.evicted,
+            "ttl": self.ttl,
+        }
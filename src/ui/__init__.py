@@ -1,21 +1,35 @@
 """
 Smart Ice Tracker - UI Package
 Module Streamlit applications
+
+Các app được import khi dùng lần đầu (lazy): mỗi app gọi st.set_page_config
+lúc import, nên import src.ui (hoặc src.ui.dashboard_ui) không được chạy chúng.
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Smart Ice Tracker Team"
 
-# Import chính UI apps
-try:
-    from .app_basic import main as run_app_basic
-    from .app_advanced import main as run_app_advanced
-    from .app_camera import main as run_app_camera
-except ImportError as e:
-    print(f"⚠️ Import error in src.ui: {e}")
-
-__all__ = [
-    'run_app_basic',
-    'run_app_advanced',
-    'run_app_camera',
-]
+# Tên public -> (module, thuộc tính)
+_EXPORTS = {
+    'run_app_basic': ('.app_basic', 'main'),
+    'run_app_advanced': ('.app_advanced', 'main'),
+    'run_app_camera': ('.app_camera', 'main'),
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _EXPORTS[name]
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except (ImportError, AttributeError) as e:
+        print(f"⚠️ Import error in src.ui: {e}")
+        raise
+    globals()[name] = value
+    return value
+
+
+__all__ = list(_EXPORTS)
@@ -6,9 +6,9 @@ Với kết nối real-time camera và Firebase
 import streamlit as st
 import cv2
 import numpy as np
-import firebase_admin
-from firebase_admin import credentials, db
-from datetime import datetime, timedelta
+import os
+import sys
+from datetime import datetime
 import pandas as pd
 from pathlib import Path
 import threading
@@ -16,6 +16,12 @@ import time
 import io
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config.settings import STORAGE_BACKEND
+from src.core.dashboard_data import get_plate_dataframe
+from src.ui.dashboard_ui import PLATE_COLUMN_CONFIG, get_data_version, get_rollup_summary
+from src.core.storage import get_storage
+
 # Import camera helper
 try:
     from camera_helper import CameraStreamManager, frame_to_rgb, FPSCounter
@@ -74,61 +80,14 @@ st.markdown("""
 # ===============================
 @st.cache_resource
 def init_firebase():
-    """Khởi tạo Firebase nếu chưa được khởi tạo"""
-    if not firebase_admin._apps:
-        try:
-            cred = credentials.Certificate("firebase-key.json")
-            firebase_admin.initialize_app(cred, {
-                'databaseURL': 'https://smarticetracker-default-rtdb.asia-southeast1.firebasedatabase.app/'
-            })
-            return True, "✅ Kết nối Firebase thành công"
-        except FileNotFoundError:
-            return False, "❌ Không tìm thấy firebase-key.json"
-        except Exception as e:
-            return False, f"❌ Lỗi kết nối Firebase: {str(e)}"
-    return True, "✅ Firebase đã sẵn sàng"
-
-# ===============================
-# 📊 Hàm lấy dữ liệu từ Firebase
-# ===============================
-def get_license_plate_data(days=1):
-    """Lấy dữ liệu biển số từ Firebase trong N ngày gần nhất"""
+    """Khởi tạo storage (Firebase / SQLite / memory theo STORAGE_BACKEND)"""
     try:
-        data = {}
-        ref = db.reference('license_plates')
-        
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-            date_ref = ref.child(date)
-            
-            try:
-                date_data = date_ref.get().val()
-                if date_data:
-                    data[date] = date_data
-            except:
-                continue
-        
-        return data
+        get_storage()
+        return True, f"✅ Kết nối {STORAGE_BACKEND} thành công"
+    except FileNotFoundError:
+        return False, "❌ Không tìm thấy firebase-key.json"
     except Exception as e:
-        st.error(f"❌ Lỗi lấy dữ liệu: {e}")
-        return {}
-
-def process_firebase_data(raw_data):
-    """Xử lý dữ liệu Firebase thành DataFrame"""
-    rows = []
-    for date, plates_data in raw_data.items():
-        if isinstance(plates_data, dict):
-            for plate_key, plate_info in plates_data.items():
-                if isinstance(plate_info, dict):
-                    row = {
-                        'Ngày': date,
-                        'Biển Số': plate_info.get('plate', 'N/A'),
-                        'Số Bao': plate_info.get('bag', 0),
-                        'Thời Gian': plate_info.get('timestamp', 'N/A')
-                    }
-                    rows.append(row)
-    
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+        return False, f"❌ Lỗi kết nối {STORAGE_BACKEND}: {str(e)}"
 
 # ===============================
 # 🎥 Trang 1: Xem Camera
@@ -292,17 +251,14 @@ def page_data_management():
         st.cache_data.clear()
         st.success("✅ Dữ liệu đã được làm mới!")
     
-    # Lấy dữ liệu
-    firebase_data = get_license_plate_data(days=days)
-    
-    if not firebase_data:
-        st.warning("⚠️ Không có dữ liệu trong khoảng thời gian được chọn")
-        return
-    
-    df = process_firebase_data(firebase_data)
+    # Lấy dữ liệu (bản sao live; DataFrame chỉ dựng lại khi version thay đổi)
+    version, load_ms = get_data_version()
+    st.caption(f"⏱️ Nạp ban đầu {load_ms:.0f} ms · cập nhật live (phiên bản {version})")
+    df = get_plate_dataframe(days, version)
+    summary = get_rollup_summary(days, version)
     
     if df.empty:
-        st.warning("⚠️ Không có dữ liệu để hiển thị")
+        st.warning("⚠️ Không có dữ liệu trong khoảng thời gian được chọn")
         return
     
     # Tab 1: Xem Dữ Liệu Thô
@@ -314,11 +270,11 @@ def page_data_management():
         # Thống kê nhanh
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("📦 Tổng Bao", int(df['Số Bao'].sum()))
+            st.metric("📦 Tổng Bao", summary['bags'])
         with col2:
-            st.metric("🚗 Biển Số Duy Nhất", df['Biển Số'].nunique())
+            st.metric("🚗 Biển Số Duy Nhất", len(summary['plates']))
         with col3:
-            st.metric("📝 Tổng Bản Ghi", len(df))
+            st.metric("🚚 Lượt Xe", summary['trucks'])
         with col4:
             st.metric("📅 Ngày", time_range)
         
@@ -334,7 +290,8 @@ def page_data_management():
             df.sort_values('Ngày', ascending=False),
             use_container_width=True,
             height=400,
-            hide_index=True
+            hide_index=True,
+            column_config=PLATE_COLUMN_CONFIG
         )
     
     with tab2:
@@ -344,16 +301,16 @@ def page_data_management():
         
         with col1:
             st.markdown("### 🚗 Top 10 Biển Số Nhiều Bao Nhất")
-            if len(df) > 0:
-                top_plates = df.groupby('Biển Số')['Số Bao'].sum().sort_values(ascending=False).head(10)
+            if summary['plates']:
+                top_plates = pd.Series(summary['plates'], dtype='int64').sort_values(ascending=False).head(10)
                 st.bar_chart(top_plates)
             else:
                 st.info("Không có dữ liệu")
         
         with col2:
             st.markdown("### 📅 Bao Đếm Theo Ngày")
-            if len(df) > 0:
-                daily_bags = df.groupby('Ngày')['Số Bao'].sum().sort_index()
+            if summary['daily']:
+                daily_bags = pd.Series(summary['daily'], dtype='int64').sort_index()
                 st.line_chart(daily_bags)
             else:
                 st.info("Không có dữ liệu")
@@ -378,9 +335,9 @@ def page_data_management():
             with col2:
                 st.metric("📝 Số Lần Phát Hiện", len(plate_data))
             with col3:
-                st.metric("📅 Ngày Gần Nhất", plate_data['Ngày'].iloc[0] if len(plate_data) > 0 else "N/A")
+                st.metric("📅 Ngày Gần Nhất", plate_data['Ngày'].iloc[0].strftime('%Y-%m-%d') if len(plate_data) > 0 else "N/A")
             
-            st.dataframe(plate_data, use_container_width=True, hide_index=True)
+            st.dataframe(plate_data, use_container_width=True, hide_index=True, column_config=PLATE_COLUMN_CONFIG)
     
     with tab3:
         st.subheader("💾 Xuất Dữ Liệu")
@@ -405,8 +362,8 @@ def page_data_management():
                     df.to_excel(writer, index=False, sheet_name='License Plates')
                     # Thêm sheet thống kê
                     summary_df = pd.DataFrame({
-                        'Metric': ['Total Bags', 'Unique Plates', 'Total Records'],
-                        'Value': [int(df['Số Bao'].sum()), df['Biển Số'].nunique(), len(df)]
+                        'Metric': ['Total Bags', 'Unique Plates', 'Trucks'],
+                        'Value': [summary['bags'], len(summary['plates']), summary['trucks']]
                     })
                     summary_df.to_excel(writer, index=False, sheet_name='Summary')
                 
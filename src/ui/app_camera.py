@@ -7,17 +7,21 @@ Hiển thị camera thực tế từ main.py
 import streamlit as st
 import cv2
 import numpy as np
-import firebase_admin
-from firebase_admin import credentials, db
-from datetime import datetime, timedelta
+import os
+from datetime import datetime
 import pandas as pd
 from pathlib import Path
 import threading
-import time
 import io
 import queue
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from config.settings import STORAGE_BACKEND
+from src.core.dashboard_data import get_plate_dataframe
+from src.ui.dashboard_ui import PLATE_COLUMN_CONFIG, get_data_version, get_rollup_summary
+from src.core.storage import get_storage
+
 # ===============================
 # ⚙️ Cấu Hình Streamlit
 # ===============================
@@ -69,62 +73,14 @@ st.markdown("""
 # ===============================
 @st.cache_resource
 def init_firebase():
-    """Khởi tạo Firebase nếu chưa được khởi tạo"""
-    if not firebase_admin._apps:
-        try:
-            cred = credentials.Certificate("firebase-key.json")
-            firebase_admin.initialize_app(cred, {
-                'databaseURL': 'https://smarticetracker-default-rtdb.asia-southeast1.firebasedatabase.app/'
-            })
-            return True, "✅ Kết nối Firebase thành công"
-        except FileNotFoundError:
-            return False, "❌ Không tìm thấy firebase-key.json"
-        except Exception as e:
-            return False, f"❌ Lỗi kết nối Firebase: {str(e)}"
-    return True, "✅ Firebase đã sẵn sàng"
-
-# ===============================
-# 📊 Hàm lấy dữ liệu từ Firebase
-# ===============================
-@st.cache_data(ttl=10)  # Làm mới mỗi 10 giây
-def get_license_plate_data(days=1):
-    """Lấy dữ liệu biển số từ Firebase trong N ngày gần nhất"""
+    """Khởi tạo storage (Firebase / SQLite / memory theo STORAGE_BACKEND)"""
     try:
-        data = {}
-        ref = db.reference('license_plates')
-        
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-            date_ref = ref.child(date)
-            
-            try:
-                date_data = date_ref.get().val()
-                if date_data:
-                    data[date] = date_data
-            except:
-                continue
-        
-        return data
+        get_storage()
+        return True, f"✅ Kết nối {STORAGE_BACKEND} thành công"
+    except FileNotFoundError:
+        return False, "❌ Không tìm thấy firebase-key.json"
     except Exception as e:
-        st.error(f"❌ Lỗi lấy dữ liệu: {e}")
-        return {}
-
-def process_firebase_data(raw_data):
-    """Xử lý dữ liệu Firebase thành DataFrame"""
-    rows = []
-    for date, plates_data in raw_data.items():
-        if isinstance(plates_data, dict):
-            for plate_key, plate_info in plates_data.items():
-                if isinstance(plate_info, dict):
-                    row = {
-                        'Ngày': date,
-                        'Biển Số': plate_info.get('plate', 'N/A'),
-                        'Số Bao': plate_info.get('bag', 0),
-                        'Thời Gian': plate_info.get('timestamp', 'N/A')
-                    }
-                    rows.append(row)
-    
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+        return False, f"❌ Lỗi kết nối {STORAGE_BACKEND}: {str(e)}"
 
 # ===============================
 # 🎥 Trang 1: Xem Camera
@@ -189,23 +145,23 @@ def page_camera():
     st.subheader("📈 Thống Kê Thực Thời (Hôm Nay)")
     
     # Lấy dữ liệu mới nhất
-    firebase_data = get_license_plate_data(days=1)
-    if firebase_data:
-        df = process_firebase_data(firebase_data)
-        if not df.empty:
-            total_bags = int(df['Số Bao'].sum())
-            unique_plates = df['Biển Số'].nunique()
-            total_records = len(df)
-            
-            col_stats1, col_stats2, col_stats3, col_stats4 = st.columns(4)
-            with col_stats1:
-                st.metric("📦 Tổng Bao", total_bags, delta="+5 từ lần cuối")
-            with col_stats2:
-                st.metric("🚗 Biển Số", unique_plates, delta="+2")
-            with col_stats3:
-                st.metric("📝 Bản Ghi", total_records)
-            with col_stats4:
-                st.metric("⏱️ Cập Nhật", datetime.now().strftime("%H:%M:%S"))
+    version = get_data_version()[0]
+    df = get_plate_dataframe(1, version)
+    if not df.empty:
+        summary = get_rollup_summary(1, version)
+        total_bags = summary['bags']
+        unique_plates = len(summary['plates'])
+        total_trucks = summary['trucks']
+        
+        col_stats1, col_stats2, col_stats3, col_stats4 = st.columns(4)
+        with col_stats1:
+            st.metric("📦 Tổng Bao", total_bags, delta="+5 từ lần cuối")
+        with col_stats2:
+            st.metric("🚗 Biển Số", unique_plates, delta="+2")
+        with col_stats3:
+            st.metric("🚚 Lượt Xe", total_trucks)
+        with col_stats4:
+            st.metric("⏱️ Cập Nhật", datetime.now().strftime("%H:%M:%S"))
     else:
         st.warning("⚠️ Chưa có dữ liệu từ Firebase. Hãy chạy `python main.py` trước!")
         col1, col2, col3, col4 = st.columns(4)
@@ -214,7 +170,7 @@ def page_camera():
         with col2:
             st.metric("🚗 Biển Số", 0)
         with col3:
-            st.metric("📝 Bản Ghi", 0)
+            st.metric("🚚 Lượt Xe", 0)
         with col4:
             st.metric("⏱️ Cập Nhật", "N/A")
     
@@ -222,10 +178,10 @@ def page_camera():
     st.divider()
     st.subheader("📜 Lịch Sử Gần Nhất")
     
-    if firebase_data and not df.empty:
+    if not df.empty:
         df_sorted = df.sort_values('Thời Gian', ascending=False).head(10)
         df_display = df_sorted[['Ngày', 'Biển Số', 'Số Bao', 'Thời Gian']].copy()
-        st.dataframe(df_display, use_container_width=True, hide_index=True)
+        st.dataframe(df_display, use_container_width=True, hide_index=True, column_config=PLATE_COLUMN_CONFIG)
     else:
         st.info("📭 Chưa có dữ liệu")
 
@@ -242,10 +198,6 @@ def page_data_management():
     col_refresh1, col_refresh2 = st.sidebar.columns([1, 2])
     with col_refresh1:
         auto_refresh = st.checkbox("🔄 Auto Refresh", value=True)
-    if auto_refresh:
-        import time
-        time.sleep(10)
-        st.rerun()
     
     time_range = st.sidebar.selectbox(
         "Chọn khoảng thời gian:",
@@ -261,18 +213,51 @@ def page_data_management():
         st.cache_data.clear()
         st.success("✅ Dữ liệu đã được làm mới!")
     
-    # Lấy dữ liệu
-    firebase_data = get_license_plate_data(days=days)
-    
-    if not firebase_data:
-        st.warning("⚠️ Không có dữ liệu trong khoảng thời gian được chọn")
-        return
-    
-    df = process_firebase_data(firebase_data)
+    if auto_refresh:
+        live_data_views(days, time_range)
+    else:
+        render_data_views(days, time_range)
+
+def filter_plates(df, search_plate):
+    """Các dòng có biển số chứa search_plate (không phân biệt hoa thường)"""
+    if not search_plate:
+        return df
+    return df[df['Biển Số'].str.contains(search_plate, case=False, na=False)]
+
+@st.cache_data(max_entries=4)
+def build_exports(days, version, search_plate=""):
+    """
+    (CSV, Excel bytes | None) theo version và từ khóa tìm kiếm: không dựng lại
+    file mỗi lần refresh; file xuất chỉ gồm các biển số đang được lọc
+    """
+    df = filter_plates(get_plate_dataframe(days, version), search_plate)
+    summary = get_rollup_summary(days, version)
+    csv = df.to_csv(index=False, encoding='utf-8-sig')
+    try:
+        excel_buffer = io.BytesIO()
+        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False, sheet_name='License Plates')
+            # Thêm sheet thống kê
+            summary_df = pd.DataFrame({
+                'Metric': ['Total Bags', 'Unique Plates', 'Trucks'],
+                'Value': [summary['bags'], len(summary['plates']), summary['trucks']]
+            })
+            summary_df.to_excel(writer, index=False, sheet_name='Summary')
+        return csv, excel_buffer.getvalue()
+    except ImportError:
+        return csv, None
+
+def render_data_views(days, time_range):
+    """Metrics + bảng + biểu đồ; DataFrame lấy từ cache theo version. Trả về version đã vẽ"""
+    # Lấy dữ liệu (bản sao live; DataFrame chỉ dựng lại khi version thay đổi)
+    version, load_ms = get_data_version()
+    st.caption(f"⏱️ Nạp ban đầu {load_ms:.0f} ms · cập nhật live (phiên bản {version})")
+    df = get_plate_dataframe(days, version)
+    summary = get_rollup_summary(days, version)
     
     if df.empty:
-        st.warning("⚠️ Không có dữ liệu để hiển thị")
-        return
+        st.warning("⚠️ Không có dữ liệu trong khoảng thời gian được chọn")
+        return version
     
     # Tab 1: Xem Dữ Liệu Thô
     tab1, tab2, tab3 = st.tabs(["📋 Dữ Liệu Thô", "📈 Thống Kê", "💾 Xuất Dữ Liệu"])
@@ -283,11 +268,11 @@ def page_data_management():
         # Thống kê nhanh
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("📦 Tổng Bao", int(df['Số Bao'].sum()))
+            st.metric("📦 Tổng Bao", summary['bags'])
         with col2:
-            st.metric("🚗 Biển Số Duy Nhất", df['Biển Số'].nunique())
+            st.metric("🚗 Biển Số Duy Nhất", len(summary['plates']))
         with col3:
-            st.metric("📝 Tổng Bản Ghi", len(df))
+            st.metric("🚚 Lượt Xe", summary['trucks'])
         with col4:
             st.metric("📅 Khoảng", time_range)
         
@@ -295,15 +280,15 @@ def page_data_management():
         
         # Tìm kiếm
         search_plate = st.text_input("🔍 Tìm kiếm biển số:", placeholder="Nhập biển số...")
-        if search_plate:
-            df = df[df['Biển Số'].str.contains(search_plate, case=False, na=False)]
+        df = filter_plates(df, search_plate)
         
         # Bảng dữ liệu
         st.dataframe(
             df.sort_values('Ngày', ascending=False),
             use_container_width=True,
             height=400,
-            hide_index=True
+            hide_index=True,
+            column_config=PLATE_COLUMN_CONFIG
         )
     
     with tab2:
@@ -313,16 +298,16 @@ def page_data_management():
         
         with col1:
             st.markdown("### 🚗 Top 10 Biển Số Nhiều Bao Nhất")
-            if len(df) > 0:
-                top_plates = df.groupby('Biển Số')['Số Bao'].sum().sort_values(ascending=False).head(10)
+            if summary['plates']:
+                top_plates = pd.Series(summary['plates'], dtype='int64').sort_values(ascending=False).head(10)
                 st.bar_chart(top_plates)
             else:
                 st.info("Không có dữ liệu")
         
         with col2:
             st.markdown("### 📅 Bao Đếm Theo Ngày")
-            if len(df) > 0:
-                daily_bags = df.groupby('Ngày')['Số Bao'].sum().sort_index()
+            if summary['daily']:
+                daily_bags = pd.Series(summary['daily'], dtype='int64').sort_index()
                 st.line_chart(daily_bags)
             else:
                 st.info("Không có dữ liệu")
@@ -347,9 +332,9 @@ def page_data_management():
             with col2:
                 st.metric("📝 Số Lần Phát Hiện", len(plate_data))
             with col3:
-                st.metric("📅 Ngày Gần Nhất", plate_data['Ngày'].iloc[0] if len(plate_data) > 0 else "N/A")
+                st.metric("📅 Ngày Gần Nhất", plate_data['Ngày'].iloc[0].strftime('%Y-%m-%d') if len(plate_data) > 0 else "N/A")
             
-            st.dataframe(plate_data, use_container_width=True, hide_index=True)
+            st.dataframe(plate_data, use_container_width=True, hide_index=True, column_config=PLATE_COLUMN_CONFIG)
     
     with tab3:
         st.subheader("💾 Xuất Dữ Liệu")
@@ -358,7 +343,7 @@ def page_data_management():
         
         with col1:
             # Xuất CSV
-            csv = df.to_csv(index=False, encoding='utf-8-sig')
+            csv, excel_bytes = build_exports(days, version, search_plate)
             st.download_button(
                 label="📥 Tải CSV",
                 data=csv,
@@ -368,27 +353,23 @@ def page_data_management():
         
         with col2:
             # Xuất Excel
-            try:
-                excel_buffer = io.BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='License Plates')
-                    # Thêm sheet thống kê
-                    summary_df = pd.DataFrame({
-                        'Metric': ['Total Bags', 'Unique Plates', 'Total Records'],
-                        'Value': [int(df['Số Bao'].sum()), df['Biển Số'].nunique(), len(df)]
-                    })
-                    summary_df.to_excel(writer, index=False, sheet_name='Summary')
-                
-                excel_buffer.seek(0)
-                
+            if excel_bytes is not None:
                 st.download_button(
                     label="📥 Tải Excel",
-                    data=excel_buffer.getvalue(),
+                    data=excel_bytes,
                     file_name=f"license_plates_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
-            except ImportError:
+            else:
                 st.info("💡 Cài đặt openpyxl để xuất file Excel: pip install openpyxl")
+    
+    return version
+
+# Auto refresh không chặn trang: st.fragment (streamlit >= 1.37) chỉ chạy lại phần
+# dữ liệu mỗi AUTO_REFRESH_SECONDS giây; DataFrame / thống kê chỉ dựng lại khi version
+# của bản sao live đổi (get_data_version -> refresh() thấy cả ghi từ process khác)
+AUTO_REFRESH_SECONDS = 10
+live_data_views = st.fragment(run_every=AUTO_REFRESH_SECONDS)(render_data_views)
 
 # ===============================
 # 🎯 Main Navigation
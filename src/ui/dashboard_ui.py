@@ -0,0 +1,34 @@
+"""
+Dashboard UI - phần Streamlit dùng chung cho các app
+(cache, hiển thị lỗi, cấu hình cột); dữ liệu lấy từ src.core.dashboard_data
+"""
+
+import os
+import sys
+
+import streamlit as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from src.core import dashboard_data
+from src.core.dashboard_data import plate_column_config, rollup_summary
+
+# Cột datetime64: chỉ hiện ngày / giờ
+PLATE_COLUMN_CONFIG = plate_column_config(st.column_config)
+
+
+def get_data_version():
+    """(version, thời gian nạp ban đầu ms) của bản sao live license_plates/ dùng chung mọi phiên"""
+    try:
+        return dashboard_data.get_data_version()
+    except Exception as e:
+        st.error(f"❌ Lỗi lấy dữ liệu: {e}")
+        return -1, 0.0
+
+
+@st.cache_data(max_entries=16)
+def get_rollup_summary(days, version):
+    """
+    Tổng bao / lượt xe / theo ngày / theo biển số từ license_plate_stats/ (ghi sẵn
+    lúc lưu dữ liệu): đọc vài node nhỏ thay vì groupby trên bản ghi thô
+    """
+    return rollup_summary(days, version)
@@ -8,7 +8,11 @@ __author__ = "Smart Ice Tracker Team"
 
 # Import utilities
 try:
-    from .camera_helper import CameraStreamManager, FPSCounter, frame_to_rgb
+    from .camera_helper import (
+        CameraStreamManager, FPSCounter, frame_to_rgb,
+        FrameSource, LatestFrameReader, open_frame_source, PreviewGate,
+        OverlayRenderer, get_overlay_renderer, draw_bbox,
+    )
 except ImportError as e:
     print(f"⚠️ Import error in src.utils: {e}")
 
@@ -16,4 +20,11 @@ __all__ = [
     'CameraStreamManager',
     'FPSCounter',
     'frame_to_rgb',
+    'FrameSource',
+    'LatestFrameReader',
+    'open_frame_source',
+    'PreviewGate',
+    'OverlayRenderer',
+    'get_overlay_renderer',
+    'draw_bbox',
 ]
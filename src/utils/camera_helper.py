@@ -163,6 +163,179 @@ class CameraStreamManager:
         print("⏹️ Dừng tất cả camera")
 
 
+# ===== Nguồn frame: đọc đồng bộ hoặc decode ở thread riêng =====
+class FrameSource:
+    """Đọc frame đồng bộ từ cv2.VideoCapture (video file: không bỏ frame)"""
+
+    # True nếu read() có thể bỏ qua frame trong lúc inference chạy
+    drops_frames = False
+
+    def __init__(self, source):
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def read(self):
+        """Trả về (ret, frame, capture_time)"""
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None, None
+        self.frames_captured += 1
+        return True, frame, time.time()
+
+    def record_latency(self, capture_time):
+        """Ghi nhận độ trễ end-to-end (từ lúc capture đến lúc xử lý xong)"""
+        if capture_time is None:
+            return
+        latency = time.time() - capture_time
+        self.latency_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def stats(self):
+        """Thống kê capture: số frame, số frame bị bỏ, độ trễ (ms)"""
+        avg = self.latency_total / self.latency_count if self.latency_count else 0.0
+        return {
+            "captured": self.frames_captured,
+            "dropped": self.frames_dropped,
+            "drop_rate": self.frames_dropped / self.frames_captured if self.frames_captured else 0.0,
+            "latency_avg_ms": avg * 1000,
+            "latency_max_ms": self.latency_max * 1000,
+        }
+
+    def release(self):
+        self.cap.release()
+
+
+class LatestFrameReader(FrameSource):
+    """
+    Decode frame ở thread riêng vào 1 slot duy nhất (ghi đè).
+    Luồng inference luôn nhận frame mới nhất; frame cũ chưa được
+    đọc sẽ bị bỏ và được đếm vào frames_dropped.
+    """
+
+    drops_frames = True
+
+    def __init__(self, source):
+        super().__init__(source)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._cond = threading.Condition()
+        self._frame = None
+        self._capture_time = None
+        self._seq = 0
+        self._read_seq = 0
+        self._stopped = not self.cap.isOpened()
+        self._thread = threading.Thread(
+            target=self._capture_loop,
+            daemon=True,
+            name=f"Capture-{source}"
+        )
+        if not self._stopped:
+            self._thread.start()
+
+    def _capture_loop(self):
+        while not self._stopped:
+            ret, frame = self.cap.read()
+            capture_time = time.time()
+            with self._cond:
+                if not ret:
+                    self._stopped = True
+                    self._cond.notify_all()
+                    break
+                if self._seq != self._read_seq:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._capture_time = capture_time
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+    def read(self):
+        """Chờ frame mới hơn frame đã đọc; trả về (ret, frame, capture_time)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != self._read_seq or self._stopped)
+            if self._seq == self._read_seq:
+                return False, None, None
+            self._read_seq = self._seq
+            return True, self._frame, self._capture_time
+
+    def release(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.cap.release()
+
+
+def is_live_source(source):
+    """Camera ID (0, 1, ...) hoặc stream URL được coi là nguồn live"""
+    if isinstance(source, int):
+        return True
+    source = str(source)
+    return source.isdigit() or source.lower().startswith(("rtsp://", "rtmp://", "http://", "https://"))
+
+
+def open_frame_source(source, threaded=None):
+    """
+    Mở nguồn frame. threaded=None: tự chọn thread capture cho nguồn live,
+    đọc đồng bộ cho video file (để không bỏ frame khi đếm).
+    """
+    if threaded is None:
+        threaded = is_live_source(source)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return LatestFrameReader(source) if threaded else FrameSource(source)
+
+
+# ===== Preview: chỉ vẽ annotation khi có người xem =====
+class PreviewGate:
+    """
+    Quyết định frame nào cần vẽ annotation.
+    Không có frame_queue (headless) hoặc display_active chưa set -> không vẽ;
+    ngược lại vẽ tối đa preview_fps frame mỗi giây (0 = không giới hạn).
+    """
+
+    def __init__(self, frame_queue=None, preview_fps=15, display_active=None):
+        self.frame_queue = frame_queue
+        self.interval = 1.0 / preview_fps if preview_fps else 0.0
+        self.display_active = display_active
+        self.last_time = 0.0
+        self.rendered = 0
+        self.skipped = 0
+
+    def due(self):
+        if self.frame_queue is None:
+            return False
+        if self.display_active is not None and not self.display_active.is_set():
+            self.skipped += 1
+            return False
+        now = time.monotonic()
+        if now - self.last_time < self.interval:
+            self.skipped += 1
+            return False
+        self.last_time = now
+        self.rendered += 1
+        return True
+
+    def publish(self, frame):
+        """Đẩy frame vào queue, bỏ qua nếu queue đầy"""
+        try:
+            self.frame_queue.put_nowait(frame)
+        except queue.Full:
+            pass
+
+
 # ===== Hàm hỗ trợ chuyển đổi OpenCV frame sang RGB =====
 def frame_to_rgb(frame):
     """Chuyển frame OpenCV (BGR) sang RGB cho Streamlit"""
@@ -171,17 +344,92 @@ def frame_to_rgb(frame):
     return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
 
+# ===== Tô màu vùng (ROI / bounding box) chỉ trong bbox =====
+class OverlayRenderer:
+    """
+    Tô màu bán trong suốt lên đa giác / hình chữ nhật.
+    Mask và màu tô được tính 1 lần cho mỗi (độ phân giải, đa giác), tối đa
+    MAX_POLYGON_SETS bộ; hình chữ nhật (box thay đổi mỗi frame) blend với màu
+    vô hướng, không cache. Chỉ blend trong bounding box của vùng, ghi thẳng
+    vào frame. alpha: trọng số của ảnh gốc (0.8 = giữ 80% ảnh, 20% màu tô).
+    """
+
+    MAX_POLYGON_SETS = 16
+
+    def __init__(self, color=(128, 0, 128), alpha=0.8):
+        self.color = color
+        self.alpha = alpha
+        self._polygon_cache = {}
+        # region * alpha + color * (1 - alpha), từng kênh, dạng cv2 Scalar
+        self._scale = (alpha,) * 3 + (0,)
+        self._offset = tuple(c * (1 - alpha) for c in color) + (0,)
+
+    def _prepare(self, polygons, shape):
+        h, w = shape[:2]
+        key = (h, w, b"".join(np.asarray(p, np.int32).tobytes() for p in polygons))
+        cached = self._polygon_cache.get(key)
+        if cached is None:
+            points = np.concatenate([np.asarray(p, np.int32).reshape(-1, 2) for p in polygons])
+            x0, y0 = np.maximum(points.min(axis=0), 0)
+            x1, y1 = np.minimum(points.max(axis=0) + 1, [w, h])
+            mask = np.zeros((max(y1 - y0, 0), max(x1 - x0, 0)), np.uint8)
+            local = [np.asarray(p, np.int32).reshape(-1, 1, 2) - [x0, y0] for p in polygons]
+            cv2.fillPoly(mask, local, 1)
+            tint = np.empty(mask.shape + (3,), np.uint8)
+            tint[:] = self.color
+            if len(self._polygon_cache) >= self.MAX_POLYGON_SETS:
+                self._polygon_cache.clear()
+            cached = (int(x0), int(y0), int(x1), int(y1), mask.astype(bool)[..., None], tint)
+            self._polygon_cache[key] = cached
+        return cached
+
+    def blend_polygons(self, frame, polygons):
+        """Tô màu các đa giác (tọa độ full-frame) lên frame, tại chỗ"""
+        x0, y0, x1, y1, mask, tint = self._prepare(polygons, frame.shape)
+        if x1 <= x0 or y1 <= y0:
+            return frame
+        region = frame[y0:y1, x0:x1]
+        blended = cv2.addWeighted(region, self.alpha, tint, 1 - self.alpha, 0)
+        np.copyto(region, blended, where=mask)
+        return frame
+
+    def blend_rect(self, frame, x1, y1, x2, y2):
+        """Tô màu hình chữ nhật lên frame, tại chỗ"""
+        h, w = frame.shape[:2]
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(x2), w), min(int(y2), h)
+        if x2 <= x1 or y2 <= y1:
+            return frame
+        region = frame[y1:y2, x1:x2]
+        region[:] = cv2.add(cv2.multiply(region, self._scale), self._offset)
+        return frame
+
+
+_overlay_renderers = {}
+
+
+def get_overlay_renderer(color=(128, 0, 128), alpha=0.8):
+    """Renderer dùng chung cho mỗi (màu, alpha)"""
+    key = (tuple(color), alpha)
+    if key not in _overlay_renderers:
+        _overlay_renderers[key] = OverlayRenderer(color, alpha)
+    return _overlay_renderers[key]
+
+
 # ===== Hàm hỗ trợ vẽ bounding box =====
-def draw_bbox(frame, x1, y1, x2, y2, label="Object", color=(0, 255, 0), thickness=2):
-    """Vẽ bounding box lên frame"""
+def draw_bbox(frame, x1, y1, x2, y2, label="Object", color=(0, 255, 0), thickness=2,
+              fill_alpha=None, text_color=None, font_scale=0.9):
+    """Vẽ bounding box lên frame (fill_alpha: tô màu bên trong box)"""
+    if fill_alpha is not None:
+        get_overlay_renderer(color, fill_alpha).blend_rect(frame, x1, y1, x2, y2)
     cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
     cv2.putText(
         frame,
         label,
-        (x1, y1 - 10),
+        (x1, max(y1 - 10, 20)),
         cv2.FONT_HERSHEY_SIMPLEX,
-        0.9,
-        color,
+        font_scale,
+        text_color or color,
         2
     )
     return frame
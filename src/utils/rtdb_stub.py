@@ -0,0 +1,143 @@
+"""
+RTDB Stub - Realtime Database giả lập qua HTTP (REST) để chạy offline
+Hỗ trợ GET / PUT / PATCH (multi-path) / DELETE trên /<path>.json
+Dùng trong tests/test_outbox.py (mất mạng -> khởi động lại -> replay,
+mất phản hồi sau khi đã ghi -> không ghi lại lần hai)
+"""
+
+import json
+import os
+import sys
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from src.core.storage import MemoryStorage, join_path, split_path
+
+# Ký tự không được phép trong key của Realtime Database
+INVALID_KEY_CHARS = set(".#$[]")
+
+
+def valid_path(path):
+    return not any(INVALID_KEY_CHARS & set(key) for key in split_path(path))
+
+
+class RtdbStub:
+    """
+    MemoryStorage phục vụ qua HTTP; available=False trả 503 (giả lập mất mạng)
+    lose_responses=n: n lần PATCH tiếp theo vẫn được ghi nhưng trả 503 (mất phản hồi)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, storage=None):
+        self.storage = storage or MemoryStorage()
+        self.available = True
+        self.lose_responses = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    @property
+    def data(self):
+        return self.storage.data
+
+    def get(self, path=""):
+        return self.storage.get(path)
+
+    # --- HTTP ---
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _path(self):
+                path = urlparse(self.path).path
+                return path[:-len(".json")] if path.endswith(".json") else path
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def _reply(self, value, status=200):
+                body = json.dumps(value).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method):
+                with stub._lock:
+                    stub.requests += 1
+                    if not stub.available:
+                        return self._reply({"error": "unavailable"}, 503)
+                    path = self._path()
+                    if method == "GET":
+                        return self._reply(stub.get(path))
+                    if method == "PUT":
+                        value = self._body()
+                        stub.storage.set(path, value)
+                        return self._reply(value)
+                    if method == "PATCH":
+                        # multi-path update: keys (may contain '/') are relative to path
+                        value = self._body()
+                        updates = {join_path(path, key): v for key, v in value.items()}
+                        if not all(valid_path(key) for key in updates):
+                            return self._reply({"error": "Invalid key in path"}, 400)
+                        stub.storage.update(updates)
+                        if stub.lose_responses > 0:
+                            stub.lose_responses -= 1
+                            return self._reply({"error": "response lost"}, 503)
+                        return self._reply(value)
+                    stub.storage.set(path, None)
+                    return self._reply(None)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="RtdbStub")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def rest_sender(base_url, timeout=5.0):
+    """Sender cho WriteAheadLog: multi-path update qua REST (PATCH /.json)"""
+    def send(updates):
+        request = urllib.request.Request(
+            f"{base_url.rstrip('/')}/.json", data=json.dumps(updates).encode(), method="PATCH",
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    return send
+
+
+
+def rest_lookup(base_url, timeout=5.0):
+    """Lookup cho WriteAheadLog: đọc các key con của path trong khoảng [start, end] qua REST"""
+    def lookup(path, start, end):
+        with urllib.request.urlopen(f"{base_url.rstrip('/')}/{path}.json", timeout=timeout) as response:
+            children = json.loads(response.read()) or {}
+        return {k: v for k, v in children.items() if start <= k <= end}
+    return lookup
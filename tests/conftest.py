@@ -0,0 +1,10 @@
+"""
+Pytest setup: repo root on sys.path and the in-memory storage backend,
+so no test can reach Firebase or write the local outbox
+"""
+
+import os
+import sys
+
+os.environ["STORAGE_BACKEND"] = "memory"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
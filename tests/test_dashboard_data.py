@@ -0,0 +1,127 @@
+"""Dashboard data: typed plate DataFrame, rollup summary, the live license_plates/ copy"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.core import dashboard_data
+from src.core.dashboard_data import (
+    PLATE_COLUMNS, LicensePlateSync, PlateFrameBuilder, build_plate_frame, get_plate_dataframe,
+    rollup_summary, summarize_rollups,
+)
+from src.core.storage import MemoryStorage, SqliteStorage
+
+
+def record(plate, bag, timestamp="08:00:00"):
+    return {"plate": plate, "bag": bag, "timestamp": timestamp}
+
+
+def today_path(plate):
+    return f"license_plates/{datetime.now():%Y-%m-%d}/plate:{plate}"
+
+
+def test_build_plate_frame_types_every_column():
+    frame = build_plate_frame({
+        "2026-10-18": {
+            "plate:65C-06855": record("65C-06855", 3, "08:15:00"),
+            "plate:51A-12345": record("51A-12345", "x", "bad"),
+        },
+        "2026-10-17": {"plate:65C-06855": record("65C-06855", 7, "23:59:59"), "junk": 1},
+    })
+    assert list(frame.columns) == PLATE_COLUMNS
+    assert isinstance(frame["Biển Số"].dtype, pd.CategoricalDtype)
+    assert frame["Số Bao"].dtype == "int64" and frame["Số Bao"].tolist() == [7, 3, 0]
+    assert frame["Ngày"].dt.strftime("%Y-%m-%d").tolist() == ["2026-10-17", "2026-10-18", "2026-10-18"]
+    assert frame["Thời Gian"].iloc[0] == pd.Timestamp("2026-10-17 23:59:59")
+    assert pd.isna(frame["Thời Gian"].iloc[2])
+
+
+def test_plate_frame_builder_rebuilds_only_changed_days():
+    builder = PlateFrameBuilder()
+    day = {"plate:65C-06855": record("65C-06855", 1)}
+    assert builder.update_day("2026-10-18", day, version=1)
+    assert not builder.update_day("2026-10-18", day, version=1)
+    assert builder.update_day("2026-10-18", {**day, "plate:51A-12345": record("51A-12345", 2)}, version=2)
+    builder.update_day("2026-10-17", day, version=1)
+    assert builder.frame(["2026-10-18"])["Biển Số"].tolist() == ["65C-06855", "51A-12345"]
+    builder.drop_day("2026-10-18")
+    assert len(builder.frame()) == 1
+    assert builder.frame(["2026-10-18"]).empty
+
+
+def test_summarize_rollups():
+    summary = summarize_rollups({
+        "2026-10-18": {"bags": 5, "trucks": 2, "plates": {"65C-06855": {"bags": 3}, "51A-12345": {"bags": 2}}},
+        "2026-10-17": {"bags": 4, "trucks": 1, "plates": {"65C-06855": {"bags": 4, "trucks": 1}}},
+    })
+    assert summary == {"bags": 9, "trucks": 3, "daily": {"2026-10-17": 4, "2026-10-18": 5},
+                       "plates": {"65C-06855": 7, "51A-12345": 2}}
+
+
+def test_unavailable_data_gives_empty_results():
+    assert list(get_plate_dataframe(7, -1).columns) == PLATE_COLUMNS
+    assert rollup_summary(7, -1) == {"bags": 0, "trucks": 0, "daily": {}, "plates": {}}
+
+
+def test_sync_follows_writes_made_in_this_process():
+    storage = MemoryStorage()
+    sync = LicensePlateSync(days=7, storage=storage).start()
+    storage.set(today_path("65C-06855"), record("65C-06855", 3))
+    storage.update({f"{today_path('65C-06855')}/bag": 4})
+    assert sync.frame()["Số Bao"].tolist() == [4]
+    sync.close()
+
+
+def test_sync_picks_up_writes_from_another_process(tmp_path):
+    db = tmp_path / "local_db.sqlite"
+    dashboard, pipeline = SqliteStorage(db), SqliteStorage(db)   # two connections, as two processes
+    sync = LicensePlateSync(days=7, storage=dashboard).start()
+    version = sync.stats()["version"]
+    assert sync.frame().empty
+
+    pipeline.set(today_path("65C-06855"), record("65C-06855", 3))
+    frame = sync.frame()
+    assert frame["Biển Số"].tolist() == ["65C-06855"] and frame["Số Bao"].tolist() == [3]
+    stats = sync.stats()
+    assert stats["version"] > version and stats["reloads"] == 1
+
+    assert sync.stats()["version"] == stats["version"]       # nothing new: no reload
+    pipeline.update({f"{today_path('65C-06855')}/bag": 5})
+    assert sync.frame()["Số Bao"].tolist() == [5]
+    sync.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [datetime(2026, 10, 17, 23, 50)]
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    monkeypatch.setattr(dashboard_data, "datetime", FakeDatetime)
+    return now
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_sync_sees_a_truck_still_loading_after_midnight(backend, clock, tmp_path):
+    path = "license_plates/2026-10-17/plate:65C-06855"
+    if backend == "memory":
+        storage = pipeline = MemoryStorage()
+    else:
+        storage, pipeline = SqliteStorage(tmp_path / "db.sqlite"), SqliteStorage(tmp_path / "db.sqlite")
+    pipeline.set(path, record("65C-06855", 1, "23:50:00"))
+    sync = LicensePlateSync(days=7, storage=storage).start()
+
+    clock[0] = datetime(2026, 10, 18, 0, 5)
+    sync.snapshot()                                     # listeners move on to the new day
+    pipeline.update({f"{path}/bag": 5})
+    _, data = sync.snapshot()
+    assert data["2026-10-17"]["plate:65C-06855"]["bag"] == 5
+
+    clock[0] = datetime(2026, 10, 19, 0, 5)
+    sync.snapshot()
+    assert sorted(sync.listeners) == ["2026-10-18", "2026-10-19"]
+    sync.close()
@@ -0,0 +1,120 @@
+"""Per-truck bag counts and rollups written through firebase_handler (memory backend)"""
+
+from datetime import datetime
+
+import pytest
+
+from src.core import firebase_handler, storage
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Fresh in-memory storage, no plate loading yet, writes flushed by hand"""
+    memory = storage.MemoryStorage()
+    monkeypatch.setattr(storage, "_storage", memory)
+    monkeypatch.setattr(firebase_handler, "current_plate", None)
+    monkeypatch.setattr(firebase_handler, "bag_tally", firebase_handler.PlateBagTally())
+    yield memory
+    firebase_handler.bag_writer.pending.clear()
+
+
+def load(plate, *counts):
+    """Plate arrives, then counters report their running totals: (source, total)"""
+    firebase_handler.save_license_plate_and_bag(plate_text=plate)
+    for source, total in counts:
+        firebase_handler.queue_bag_count(total, source)
+    firebase_handler.bag_writer.flush()
+
+
+def bags(db, day=None):
+    days = db.get("license_plates")
+    plates = days[day] if day else next(iter(days.values()))
+    return {record["plate"]: record["bag"] for record in plates.values()}
+
+
+def assert_rollups_match_records(db):
+    """Every day's rollup equals the sum of the raw bag fields"""
+    rollups = db.get(firebase_handler.ROLLUPS) or {}
+    for day, plates in db.get("license_plates").items():
+        per_plate = {}
+        for record in plates.values():
+            per_plate[record["plate"]] = per_plate.get(record["plate"], 0) + record["bag"]
+        assert rollups[day].get("bags", 0) == sum(per_plate.values())
+        assert {p: v.get("bags", 0) for p, v in rollups[day]["plates"].items()} == per_plate
+
+
+def test_each_truck_gets_only_the_bags_counted_since_its_plate(db):
+    load("65C-06855", ("cam0", 1), ("cam0", 2), ("cam0", 3))
+    load("51A-12345", ("cam0", 4), ("cam0", 5))
+    assert bags(db) == {"65C-06855": 3, "51A-12345": 2}
+    assert_rollups_match_records(db)
+
+
+def test_cameras_add_up_instead_of_overwriting_each_other(db):
+    load("65C-06855", ("cam0", 1), ("cam1", 1), ("cam0", 2))
+    load("51A-12345", ("cam1", 2), ("cam0", 3), ("cam1", 3))
+    assert bags(db) == {"65C-06855": 3, "51A-12345": 3}
+    assert_rollups_match_records(db)
+
+
+def test_counts_before_the_first_plate_are_not_written(db):
+    firebase_handler.queue_bag_count(4, "cam0")
+    firebase_handler.bag_writer.flush()
+    assert db.get("license_plates") is None
+    load("65C-06855", ("cam0", 5))
+    assert bags(db) == {"65C-06855": 1}
+
+
+def test_a_truck_coming_back_keeps_its_earlier_bags(db):
+    load("65C-06855", ("cam0", 2))
+    load("51A-12345", ("cam0", 3))
+    load("65C-06855", ("cam0", 5))
+    assert bags(db) == {"65C-06855": 4, "51A-12345": 1}
+    assert_rollups_match_records(db)
+
+
+def test_a_truck_loading_past_midnight_stays_on_its_day(db, monkeypatch):
+    clock = [datetime(2026, 10, 17, 23, 59)]
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock[0]
+
+    monkeypatch.setattr(firebase_handler, "datetime", FakeDatetime)
+    load("65C-06855", ("cam0", 1), ("cam1", 1))
+    clock[0] = datetime(2026, 10, 18, 0, 1)
+    load("65C-06855", ("cam0", 2), ("cam1", 2))
+    load("51A-12345", ("cam0", 3))
+
+    assert bags(db, "2026-10-17") == {"65C-06855": 4}
+    assert bags(db, "2026-10-18") == {"51A-12345": 1}
+    assert db.get(f"{firebase_handler.ROLLUPS}/2026-10-17/bags") == 4
+    assert_rollups_match_records(db)
+
+
+def test_a_truck_back_within_the_dedup_window_is_not_a_new_truck(db):
+    load("65C-06855", ("cam0", 1))
+    load("51A-12345", ("cam0", 2))
+    firebase_handler.save_license_plate_and_bag(plate_text="65C-06855", new_visit=False)
+    firebase_handler.queue_bag_count(4, "cam0")
+    firebase_handler.bag_writer.flush()
+    assert bags(db) == {"65C-06855": 3, "51A-12345": 1}
+    day = next(iter(db.get(firebase_handler.ROLLUPS)))
+    assert db.get(f"{firebase_handler.ROLLUPS}/{day}/trucks") == 2
+
+
+def test_rebuilt_rollups_match_the_live_ones(db):
+    load("65C-06855", ("cam0", 1))
+    load("51A-12345", ("cam0", 2))
+    load("65C-06855", ("cam0", 4))                         # a second visit
+    firebase_handler.save_license_plate_and_bag(plate_text="51A-12345", new_visit=False)
+    firebase_handler.queue_bag_count(5, "cam0")
+    firebase_handler.bag_writer.flush()
+    live = db.get(firebase_handler.ROLLUPS)
+
+    db.set(firebase_handler.ROLLUPS, None)
+    firebase_handler.rebuild_rollups(days=1)
+    assert db.get(firebase_handler.ROLLUPS) == live
+    day = next(iter(live))
+    assert live[day]["trucks"] == 3 and live[day]["plates"]["65C-06855"]["trucks"] == 2
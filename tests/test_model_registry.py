@@ -0,0 +1,85 @@
+"""Backend resolution in the model registry (no ultralytics needed: YOLO is faked)"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from src.core import detector_backend, model_registry
+
+
+class FakeYOLO:
+    loads = []
+
+    def __init__(self, path, task=None):
+        FakeYOLO.loads.append(Path(path).name)
+        if str(path).endswith(".onnx"):
+            raise RuntimeError("onnxruntime is broken")
+        self.path = path
+        self.names = {0: "bag"}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(model_registry, "_models", {})
+    monkeypatch.setattr(model_registry, "_load_times", {})
+    monkeypatch.setattr(model_registry, "_resolved", {})
+    monkeypatch.setattr(model_registry, "_device", "cpu")
+    monkeypatch.setattr(detector_backend, "backend_available", lambda backend: True)
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeYOLO))
+    FakeYOLO.loads = []
+    return model_registry
+
+
+def test_failed_export_is_not_retried(registry, monkeypatch):
+    exports = []
+
+    def export(weights, backend, imgsz=640):
+        exports.append(backend)
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(detector_backend, "export_weights", export)
+    for _ in range(3):
+        assert registry.resolve_model("weights/best.pt", backend="onnx") == (Path("weights/best.pt"), "torch")
+    assert exports == ["onnx"]
+
+
+def test_failed_load_falls_back_to_torch_once(registry, tmp_path):
+    weights = tmp_path / "best.pt"
+    (tmp_path / "best.onnx").touch()
+
+    first = registry.get_model(weights, backend="onnx", warmup=False)
+    second = registry.get_model(weights, backend="onnx", warmup=False)
+
+    assert first is second
+    assert FakeYOLO.loads == ["best.onnx", "best.pt"]
+    assert registry.resolve_model(weights, backend="onnx") == (weights, "torch")
+
+
+def test_create_model_gives_each_pipeline_its_own_model(registry, monkeypatch, tmp_path):
+    resolutions = []
+    resolve = detector_backend.resolve_weights
+
+    def counting_resolve(*args):
+        resolutions.append(args)
+        return resolve(*args)
+
+    monkeypatch.setattr(detector_backend, "resolve_weights", counting_resolve)
+    weights = tmp_path / "best.pt"
+
+    first = registry.create_model(weights, backend="torch", warmup=False)
+    second = registry.create_model(weights, backend="torch", warmup=False)
+
+    assert first is not second
+    assert len(resolutions) == 1
+
+
+def test_create_model_remembers_a_broken_export(registry, tmp_path):
+    weights = tmp_path / "best.pt"
+    (tmp_path / "best.onnx").touch()
+
+    for _ in range(3):
+        registry.create_model(weights, backend="onnx", warmup=False)
+
+    assert FakeYOLO.loads == ["best.onnx", "best.pt", "best.pt", "best.pt"]
@@ -0,0 +1,158 @@
+"""Write-ahead log: batching, replay after an outage, exactly-once increments, dead-lettering rejected rows"""
+
+import json
+import sqlite3
+import time
+
+import pytest
+
+from src.core.outbox import WriteAheadLog, is_client_error, merge_update
+from src.core.storage import combine_writes, increment
+from src.utils.rtdb_stub import RtdbStub, rest_lookup, rest_sender
+
+BASE = "license_plates/2024-01-01/plate:65C-06855"
+
+
+@pytest.fixture
+def stub():
+    stub = RtdbStub().start()
+    yield stub
+    stub.stop()
+
+
+def test_merge_update_keeps_paths_disjoint_and_in_write_order():
+    batch = {}
+    merge_update(batch, f"{BASE}/bag", 1)
+    merge_update(batch, f"{BASE}/timestamp", "08:00:00")
+    merge_update(batch, BASE, {"plate": "65C-06855", "bag": 0})
+    merge_update(batch, f"{BASE}/bag", 2)
+    assert batch == {BASE: {"plate": "65C-06855", "bag": 2}}
+
+
+def test_merge_update_sums_increments():
+    batch = {}
+    merge_update(batch, "stats/bags", increment(2))
+    merge_update(batch, "stats/bags", increment(3))
+    merge_update(batch, "stats", {"bags": 10})
+    merge_update(batch, "stats/bags", increment(1))
+    assert batch == {"stats": {"bags": 11}}
+
+
+def test_combine_writes():
+    assert combine_writes(increment(1), increment(2)) == increment(3)
+    assert combine_writes(5, increment(2)) == 7
+    assert combine_writes(increment(2), 5) == 5
+    assert combine_writes(None, increment(2)) == increment(2)
+
+
+def test_writes_made_offline_are_replayed_after_a_restart(stub, tmp_path):
+    db_path = tmp_path / "outbox.db"
+    stub.available = False
+
+    wal = WriteAheadLog(db_path, rest_sender(stub.url), batch_size=50, retry_min=0.1, retry_max=0.4)
+    wal.start()
+    wal.append({BASE: {"plate": "65C-06855", "bag": 0, "timestamp": "08:00:00"}})
+    for bag in range(1, 121):
+        wal.append({f"{BASE}/bag": bag, f"{BASE}/timestamp": "08:01:00"})
+    wal.append({"total_count": 120})
+    time.sleep(0.5)
+    stats = wal.stats()
+    wal.close()
+    assert stats["pending"] == 122 and stats["failures"] > 0
+    assert not stub.data
+
+    stub.available = True
+    wal = WriteAheadLog(db_path, rest_sender(stub.url), batch_size=50, retry_min=0.1, retry_max=0.4)
+    wal.start()
+    assert wal.flush(timeout=10.0)
+    stats = wal.stats()
+    wal.close()
+    assert stats["sent"] == 122 and stats["batches"] == 3
+    assert stub.get(BASE) == {"plate": "65C-06855", "bag": 120, "timestamp": "08:01:00"}
+    assert stub.get("total_count") == 120
+
+
+def test_rejected_row_moves_to_dead_letter_without_blocking_the_rest(stub, tmp_path):
+    wal = WriteAheadLog(tmp_path / "outbox.db", rest_sender(stub.url), batch_size=50, max_client_failures=2)
+    wal.append({f"{BASE}/bag": 1})
+    wal.append({"license_plates/2024-01-01/plate:65C.068/bag": 1})   # '.' is not a valid key
+    wal.append({f"{BASE}/bag": 2})
+
+    for _ in range(2):                                      # whole batch rejected twice
+        with pytest.raises(Exception) as error:
+            wal.drain_once()
+        assert is_client_error(error.value)
+    assert wal.drain_once() == 1                            # then one row at a time
+    with pytest.raises(Exception):
+        wal.drain_once()
+    assert wal.drain_once() == 1                            # bad row given up on (2nd rejection)
+    assert wal.drain_once() == 1
+
+    assert wal.pending() == 0
+    assert stub.get(f"{BASE}/bag") == 2
+    [(updates, reason)] = wal.dead_letters()
+    assert updates == {"license_plates/2024-01-01/plate:65C.068/bag": 1} and "400" in reason
+    assert wal.stats()["dead_lettered"] == 1
+    wal.close()
+
+
+def test_server_errors_are_retried_not_dead_lettered(stub, tmp_path):
+    stub.available = False
+    wal = WriteAheadLog(tmp_path / "outbox.db", rest_sender(stub.url), max_client_failures=1)
+    wal.append({f"{BASE}/bag": 1})
+    for _ in range(3):
+        with pytest.raises(Exception) as error:
+            wal.drain_once()
+        assert not is_client_error(error.value)
+    assert wal.pending() == 1 and not wal.dead_letters()
+    wal.close()
+
+
+def test_update_is_applied_atomically_with_its_receipt(stub, tmp_path):
+    sent = []
+    send = rest_sender(stub.url)
+    wal = WriteAheadLog(tmp_path / "outbox.db", lambda batch: (sent.append(batch), send(batch)))
+    wal.append({f"{BASE}/bag": increment(1), "license_plate_stats/2024-01-01/bags": increment(1)})
+    assert wal.drain_once() == 1
+    [batch] = sent
+    assert {f"{BASE}/bag", "license_plate_stats/2024-01-01/bags"} <= set(batch)
+    assert any(path.startswith("outbox_receipts/") for path in batch)
+    wal.close()
+
+
+def test_lost_response_is_not_applied_twice(stub, tmp_path):
+    wal = WriteAheadLog(tmp_path / "outbox.db", rest_sender(stub.url), lookup=rest_lookup(stub.url))
+    for _ in range(3):
+        wal.append({f"{BASE}/bag": increment(1), "license_plate_stats/2024-01-01/bags": increment(1)})
+    stub.lose_responses = 1
+    with pytest.raises(Exception) as error:
+        wal.drain_once()                                    # applied, but the reply is lost
+    assert not is_client_error(error.value)
+    assert wal.pending() == 3
+
+    wal.append({f"{BASE}/bag": increment(1), "license_plate_stats/2024-01-01/bags": increment(1)})
+    while wal.drain_once():
+        pass
+    assert wal.pending() == 0
+    assert stub.get(f"{BASE}/bag") == 4
+    assert stub.get("license_plate_stats/2024-01-01/bags") == 4
+    assert wal.stats()["already_applied"] == 3
+    wal.close()
+
+
+def test_rows_of_the_path_value_schema_are_migrated(stub, tmp_path):
+    db_path = tmp_path / "outbox.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT, value TEXT, created REAL)")
+    conn.executemany("INSERT INTO outbox (path, value, created) VALUES (?, ?, ?)", [
+        (f"{BASE}/bag", json.dumps(increment(2)), time.time()),
+        (f"{BASE}/timestamp", json.dumps("08:00:00"), time.time()),
+    ])
+    conn.commit()
+    conn.close()
+
+    wal = WriteAheadLog(db_path, rest_sender(stub.url), lookup=rest_lookup(stub.url))
+    assert wal.pending() == 2
+    assert wal.drain_once() == 2
+    assert stub.get(BASE) == {"bag": 2, "timestamp": "08:00:00"}
+    wal.close()
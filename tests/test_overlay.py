@@ -0,0 +1,29 @@
+"""Overlay tinting: ROI polygons and boxes blended in place"""
+
+import cv2
+import numpy as np
+
+from src.utils.camera_helper import OverlayRenderer
+
+
+def test_blend_rect_matches_a_full_tint_and_caches_nothing():
+    frame = np.random.default_rng(0).integers(0, 256, (120, 160, 3), np.uint8)
+    tint = np.empty_like(frame)
+    tint[:] = (128, 0, 128)
+    expected = cv2.addWeighted(frame, 0.8, tint, 0.2, 0)[10:50, 20:90]
+
+    renderer = OverlayRenderer((128, 0, 128), 0.8)
+    for x in range(0, 100, 7):                         # boxes of every size
+        renderer.blend_rect(frame.copy(), x, x // 2, x + 15 + x, x + 9)
+    renderer.blend_rect(frame, 20, 10, 90, 50)
+
+    assert np.abs(frame[10:50, 20:90].astype(int) - expected).max() <= 1
+    assert renderer._polygon_cache == {}
+
+
+def test_polygon_cache_is_bounded():
+    renderer = OverlayRenderer()
+    frame = np.zeros((100, 100, 3), np.uint8)
+    for i in range(OverlayRenderer.MAX_POLYGON_SETS * 2):
+        renderer.blend_polygons(frame, [np.array([[i, 0], [50, 50], [0, 60]])])
+    assert len(renderer._polygon_cache) <= OverlayRenderer.MAX_POLYGON_SETS
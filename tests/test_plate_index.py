@@ -0,0 +1,68 @@
+"""Plate normalization and collapsing reads onto the current plate"""
+
+import pytest
+
+from src.core.plate_index import PlateDeduplicator, edit_distance, normalize_plate
+
+
+@pytest.mark.parametrize("read, plate", [
+    ("65C-06855", "65C-06855"),
+    ("65c 068.55", "65C-06855"),
+    ("65C-O6855", "65C-06855"),   # O for 0 after a 1-letter series
+    ("65CO6855", "65C-06855"),
+    ("51LD-1234", "51LD-1234"),
+    ("51A-1234", "51A-1234"),
+    ("59F1-12345", "59F1-12345"),
+    ("59FO12345", "59F0-12345"),
+    ("51AO-1234", "51A-01234"),   # O/I/Q never start a 2-letter series
+    ("51AI-1234", "51A-11234"),
+    ("6SC-O6B55", "65C-06855"),
+])
+def test_normalize_plate(read, plate):
+    assert normalize_plate(read) == plate
+
+
+@pytest.mark.parametrize("read", [None, "", "ABC", "51AW1234", "51AW-12345", "1234567890"])
+def test_normalize_plate_rejects_non_plates(read):
+    assert normalize_plate(read) is None
+
+
+def test_edit_distance():
+    assert edit_distance("65C-06855", "65C-06855") == 0
+    assert edit_distance("65C-06855", "65C-06856") == 1
+    assert edit_distance("65C-06855", "65CO-6855") == 2
+
+
+def make_dedup():
+    now = [0.0]
+    return PlateDeduplicator(max_distance=1, window=300.0, clock=lambda: now[0]), now
+
+
+def test_ocr_noise_collapses_onto_the_current_plate():
+    dedup, _ = make_dedup()
+    assert dedup.canonical("65C-06855") == ("65C-06855", True, True)
+    assert dedup.canonical("65C-O6855") == ("65C-06855", False, False)
+    assert dedup.canonical("65C-06856") == ("65C-06855", False, False)
+    assert dedup.canonical("garbage") == (None, False, False)
+    assert dedup.stats()["merged"] == 1
+
+
+def test_a_plate_seen_again_after_another_switches_back():
+    dedup, now = make_dedup()
+    assert dedup.canonical("65C-06855") == ("65C-06855", True, True)
+    now[0] = 60.0
+    assert dedup.canonical("51A-12345") == ("51A-12345", True, True)
+    now[0] = 120.0
+    assert dedup.canonical("65C-06855") == ("65C-06855", True, False)   # same truck, record reused
+    now[0] = 500.0
+    assert dedup.canonical("51A-12345") == ("51A-12345", True, True)    # outside the window: new visit
+    assert dedup.current == "51A-12345"
+
+
+def test_plates_one_edit_apart_stay_apart_unless_one_is_current():
+    dedup, now = make_dedup()
+    dedup.canonical("51A-12345")
+    now[0] = 10.0
+    dedup.canonical("65C-06855")
+    now[0] = 20.0
+    assert dedup.canonical("51C-12345") == ("51C-12345", True, True)
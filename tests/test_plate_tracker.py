@@ -0,0 +1,84 @@
+"""Per-track OCR voting and the end-of-stream flush of the plate pipeline"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from src.core import license_plate
+from src.core.plate_index import PlateDeduplicator
+from src.core.plate_tracker import PlateTrackCache, clean_plate_text, vote_plate
+
+Read = namedtuple("Read", ["key", "text", "conf"])
+
+
+def test_clean_plate_text_keeps_plate_characters():
+    assert clean_plate_text(" 65c-068.55!") == "65C-068.55"
+
+
+def test_vote_plate_weights_characters_by_confidence():
+    text, score = vote_plate([("65C06855", 0.9), ("65C06B55", 0.4), ("65C06855", 0.8)])
+    assert text == "65C06855"
+    assert 0.0 < score <= 1.0
+
+
+def test_vote_plate_uses_the_dominant_length():
+    assert vote_plate([("65C0685", 0.3), ("65C06855", 0.6), ("65C06855", 0.5)])[0] == "65C06855"
+    assert vote_plate([(None, 0.0), ("", 0.0)]) == (None, 0.0)
+
+
+def test_plate_is_emitted_once_all_reads_are_in():
+    cache = PlateTrackCache(max_reads=2, lost_frames=10, top_k=2, settle_frames=1)
+    cache.seen(1, 0)
+    cache.offer(1, np.zeros((10, 40, 3), np.uint8), 0.5)
+    for text in ("65C06855", "65C06855"):
+        cache.mark_submitted(1, 0)
+        cache.add_read(1, text, 0.9)
+    assert cache.finalize(1) == [(1, "65C06855")]
+    assert cache.finalize(2) == []
+
+
+class FakePool:
+    """Synchronous stand-in for OcrWorkerPool: every crop reads as `text`"""
+
+    def __init__(self, text):
+        self.text = text
+        self.done = []
+
+    def submit_batch(self, crops, keys=None, metas=None):
+        self.done += [Read(key, self.text, 0.9) for key in keys]
+        return len(crops)
+
+    def drain(self, timeout=10.0):
+        return True
+
+    def poll(self):
+        done, self.done = self.done, []
+        return done
+
+
+def test_flush_emits_the_last_track_still_in_view(monkeypatch):
+    saved = []
+    monkeypatch.setattr(license_plate, "save_license_plate_and_bag",
+                        lambda plate_text=None, bag_count=None, new_visit=True: saved.append(plate_text))
+    cache = PlateTrackCache(max_reads=3, lost_frames=30, top_k=3, settle_frames=5)
+    pool = FakePool("65C06855")
+    cache.seen(7, 100)
+    cache.offer(7, np.zeros((10, 40, 3), np.uint8), 0.8)
+    cache.offer(7, np.zeros((10, 40, 3), np.uint8), 0.6)
+    # a read is still in flight when the video ends
+    cache.mark_submitted(7, 100)
+    pool.done.append(Read(7, "65C06855", 0.7))
+
+    license_plate.flush_plates(pool, cache, PlateDeduplicator(), frame_index=101)
+
+    assert saved == ["65C-06855"]
+    assert cache.tracks == {}
+
+
+def test_emit_plates_switches_back_to_a_plate_seen_before(monkeypatch):
+    saved = []
+    monkeypatch.setattr(license_plate, "save_license_plate_and_bag",
+                        lambda plate_text=None, bag_count=None, new_visit=True: saved.append((plate_text, new_visit)))
+    reads = [(1, "65C06855"), (1, "65C-O6855"), (2, "51A12345"), (3, "65C06855")]
+    license_plate.emit_plates(reads, PlateDeduplicator())
+    assert saved == [("65C-06855", True), ("51A-12345", True), ("65C-06855", False)]
@@ -0,0 +1,56 @@
+"""ROI membership for tracked box centroids"""
+
+import numpy as np
+import pytest
+
+from src.core.roi import RoiSet, box_centroids
+
+SHAPE = (100, 200, 3)
+
+
+@pytest.fixture
+def rois():
+    return RoiSet({
+        "left": [(0, 0), (99, 0), (99, 99), (0, 99)],
+        "band": [(50, 40), (149, 40), (149, 59), (50, 59)],   # overlaps "left"
+    })
+
+
+def test_membership_matrix(rois):
+    points = np.array([[10, 10], [60, 50], [120, 50], [180, 90]])
+    assert rois.membership(points, SHAPE).tolist() == [
+        [True, False],
+        [True, True],
+        [False, True],
+        [False, False],
+    ]
+
+
+def test_points_outside_the_frame_are_outside_every_roi(rois):
+    points = np.array([[-1, 10], [10, -5], [200, 50], [10, 100]])
+    assert not rois.membership(points, SHAPE).any()
+
+
+def test_no_points(rois):
+    assert rois.membership(np.zeros((0, 2), np.int32), SHAPE).shape == (0, 2)
+
+
+def test_mask_follows_the_frame_size(rois):
+    point = np.array([[120, 50]])
+    assert rois.membership(point, SHAPE)[0, 1]
+    assert not rois.membership(point, (100, 100)).any()      # cropped below x=120
+
+
+def test_box_centroids_and_near(rois):
+    centroids = box_centroids([[0, 0, 20, 10], [150, 80, 170, 100]])
+    assert centroids.tolist() == [[10, 5], [160, 90]]
+    assert rois.near(centroids[1:], SHAPE, padding=20)
+    assert not rois.near(centroids[1:], SHAPE, padding=0)
+    assert rois.bounding_rect(SHAPE, padding=10) == (0, 0, 160, 100)
+
+
+def test_region_limits():
+    with pytest.raises(ValueError):
+        RoiSet({})
+    with pytest.raises(ValueError):
+        RoiSet({f"r{i}": [(0, 0), (1, 0), (1, 1)] for i in range(RoiSet.MAX_ROIS + 1)})
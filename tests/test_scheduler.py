@@ -0,0 +1,36 @@
+"""FrameScheduler stride selection"""
+
+from src.core.scheduler import FrameScheduler
+
+
+def processed_of(scheduler, frames):
+    return sum(scheduler.should_process() for _ in range(frames))
+
+
+def test_target_fps_sets_the_stride():
+    scheduler = FrameScheduler(source_fps=30, target_fps=10)
+    scheduler.record(0.001)
+    assert scheduler.stride == 3
+    assert processed_of(scheduler, 30) == 10
+
+
+def test_slow_inference_raises_the_stride_for_synchronous_reads():
+    scheduler = FrameScheduler(source_fps=30, target_fps=30)
+    scheduler.record(0.1)  # 100 ms per frame: keeping up needs every 3rd frame
+    assert scheduler.stride == 3
+
+
+def test_cost_is_ignored_when_the_reader_drops_frames():
+    scheduler = FrameScheduler(source_fps=30, target_fps=30, cost_stride=False)
+    scheduler.record(0.1)
+    assert scheduler.stride == 1
+    assert processed_of(scheduler, 10) == 10
+
+
+def test_near_roi_forces_full_rate_and_stride_is_capped():
+    scheduler = FrameScheduler(source_fps=30, target_fps=30, max_stride=4)
+    scheduler.record(1.0)
+    assert scheduler.stride == 4
+    scheduler.record(1.0, near_roi=True)
+    assert scheduler.current_stride == 1
+    assert processed_of(scheduler, 5) == 5
@@ -0,0 +1,75 @@
+"""Local storage backends behave like the Realtime Database subset the project uses"""
+
+import pytest
+
+from src.core.storage import MemoryStorage, SqliteStorage, increment
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStorage()
+    return SqliteStorage(tmp_path / "local_db.sqlite")
+
+
+def test_set_get_and_multi_path_update(storage):
+    storage.set("license_plates/2026-10-18/plate:65C-06855", {"plate": "65C-06855", "bag": 0})
+    storage.update({
+        "license_plates/2026-10-18/plate:65C-06855/bag": 3,
+        "license_plates/2026-10-18/plate:65C-06855/timestamp": "08:00:00",
+        "total_count": 3,
+    })
+    assert storage.get("license_plates/2026-10-18/plate:65C-06855") == {
+        "plate": "65C-06855", "bag": 3, "timestamp": "08:00:00",
+    }
+    assert storage.get("total_count") == 3
+    assert storage.get("missing") is None
+
+
+def test_set_replaces_a_subtree_and_none_deletes(storage):
+    storage.set("a", {"b": 1, "c": {"d": 2}})
+    storage.set("a/c", 5)
+    assert storage.get("a") == {"b": 1, "c": 5}
+    storage.set("a/c", {"e": 1})
+    assert storage.get("a") == {"b": 1, "c": {"e": 1}}
+    storage.set("a/b", None)
+    assert storage.get("a") == {"c": {"e": 1}}
+
+
+def test_increments_add_to_the_stored_number(storage):
+    storage.update({"stats/bags": increment(2), "stats/plates/x/bags": increment(2)})
+    storage.update({"stats/bags": increment(3)})
+    assert storage.get("stats") == {"bags": 5, "plates": {"x": {"bags": 2}}}
+
+
+def test_query_range_by_key(storage):
+    for day in ("2026-10-15", "2026-10-16", "2026-10-17", "2026-10-18"):
+        storage.set(f"license_plates/{day}/plate:A", {"bag": int(day[-2:])})
+    result = storage.query_range("license_plates", "2026-10-16", "2026-10-17")
+    assert result == {"2026-10-16": {"plate:A": {"bag": 16}}, "2026-10-17": {"plate:A": {"bag": 17}}}
+
+
+def test_listener_gets_the_node_then_changes_below_it(storage):
+    events = []
+    storage.set("license_plates/2026-10-18/plate:A/bag", 1)
+    listener = storage.listen("license_plates/2026-10-18", events.append)
+    storage.update({"license_plates/2026-10-18/plate:A/bag": 2, "license_plates/2026-10-17/plate:B/bag": 1})
+    listener.close()
+    storage.set("license_plates/2026-10-18/plate:A/bag", 3)
+
+    assert [(e.event_type, e.path, e.data) for e in events] == [
+        ("put", "/", {"plate:A": {"bag": 1}}),
+        ("put", "/plate:A/bag", 2),
+    ]
+
+
+def test_sqlite_persists_and_reports_other_connections(tmp_path):
+    path = tmp_path / "local_db.sqlite"
+    first, second = SqliteStorage(path), SqliteStorage(path)
+    token = first.change_token()
+    first.set("a", 1)
+    assert first.change_token() == token           # own writes reach its listeners instead
+    second.set("b", 2)
+    assert first.change_token() != token
+    assert SqliteStorage(path).get() == {"a": 1, "b": 2}
+    assert MemoryStorage().change_token() is None
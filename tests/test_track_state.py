@@ -0,0 +1,38 @@
+"""Counted track IDs with time-based eviction"""
+
+import numpy as np
+
+from src.core.track_state import TrackStateStore
+
+
+def make_store(ttl=10.0):
+    now = [0.0]
+    return TrackStateStore(ttl=ttl, clock=lambda: now[0]), now
+
+
+def test_contains_many_and_add_many():
+    store, _ = make_store()
+    store.add_many(np.array([1, 2]))
+    assert store.contains_many(np.array([2, 3, 1])).tolist() == [True, False, True]
+    assert 1 in store and 3 not in store and len(store) == 2
+
+
+def test_ids_still_in_view_are_not_evicted():
+    store, now = make_store(ttl=10.0)
+    store.add_many([1, 2, 3])
+    now[0] = 8.0
+    store.touch([2, 99])                  # 99 was never counted: not added
+    now[0] = 15.0
+    assert store.evict() == 2
+    assert list(store._last_seen) == [2] and 99 not in store
+    now[0] = 18.5
+    assert store.evict() == 1 and len(store) == 0
+
+
+def test_stats():
+    store, now = make_store(ttl=1.0)
+    store.add_many([1, 2, 3])
+    now[0] = 5.0
+    store.evict()
+    store.add_many([4])
+    assert store.stats() == {"size": 1, "peak_size": 3, "added": 4, "evicted": 3, "ttl": 1.0}
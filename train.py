@@ -1,12 +1,177 @@
+"""
+Training Pipeline - Train -> Export (ONNX/OpenVINO) -> INT8 -> Report
+Chạy: python train.py            (train + export + report)
+      python train.py --skip-train --weights runs/detect/ice_tracker/weights/best.pt
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
 from ultralytics import YOLO
 
-model = YOLO("model/yolov8n.pt")
+DATA = "data/smartIceTracker-1/data.yaml"
+IMGSZ = 640
+
+
+# ==============================
+# 1. Train
+# ==============================
+def train():
+    model = YOLO("model/yolov8n.pt")
+
+    # Train với dataset từ Roboflow
+    model.train(
+        data=DATA,
+        epochs=50,        # số vòng lặp
+        imgsz=IMGSZ,      # kích thước ảnh
+        batch=16,         # batch size
+        name="ice_tracker"
+    )
+    return Path(model.trainer.best)
+
+
+# ==============================
+# 2. Export + INT8 quantization
+# ==============================
+def calibration_images(fraction, limit=300, seed=0):
+    """Ảnh calibration: một phần tập train của data/smartIceTracker-1"""
+    from ultralytics.data.utils import check_det_dataset
+
+    train_dir = Path(check_det_dataset(DATA)["train"])
+    images = sorted(p for p in train_dir.rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    random.Random(seed).shuffle(images)
+    return images[:min(limit, max(1, int(len(images) * fraction)))]
+
+
+def preprocess(image_path):
+    """Letterbox + RGB + CHW float32, giống input của model export"""
+    from ultralytics.data.augment import LetterBox
+
+    img = LetterBox(new_shape=(IMGSZ, IMGSZ), auto=False)(image=cv2.imread(str(image_path)))
+    img = img[..., ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(img, dtype=np.float32)[None] / 255.0
+
+
+def quantize_onnx(onnx_path, images):
+    """Post-training static INT8 quantization bằng ONNX Runtime"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static,
+    )
+
+    input_name = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            return None if path is None else {input_name: preprocess(path)}
+
+    out = onnx_path.with_name(f"{onnx_path.stem}_int8.onnx")
+    quantize_static(
+        str(onnx_path), str(out), Reader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    return out
+
+
+def export_variants(best, calib_fraction):
+    """Export best.pt thành các biến thể; biến thể nào lỗi thì bỏ qua"""
+    variants = {"torch-fp32": best}
+    model = YOLO(str(best))
+    images = calibration_images(calib_fraction)
+    print(f"Calibration images: {len(images)}")
+
+    steps = [
+        ("onnx-fp32", lambda: model.export(format="onnx", imgsz=IMGSZ, dynamic=True)),
+        ("openvino-fp32", lambda: model.export(format="openvino", imgsz=IMGSZ, dynamic=True)),
+        ("openvino-int8", lambda: model.export(format="openvino", imgsz=IMGSZ, int8=True,
+                                               data=DATA, fraction=calib_fraction)),
+        ("onnx-int8", lambda: quantize_onnx(Path(variants["onnx-fp32"]), images)),
+    ]
+    for name, step in steps:
+        try:
+            variants[name] = Path(step())
+            print(f"OK: {name} -> {variants[name]}")
+        except Exception as e:
+            print(f"WARNING: {name} skipped: {e}")
+
+    return variants, images
+
+
+# ==============================
+# 3. Evaluate: mAP + CPU latency
+# ==============================
+def cpu_latency_ms(model, images, runs=50):
+    frames = [cv2.imread(str(p)) for p in images[:runs]]
+    model.predict(frames[0], imgsz=IMGSZ, device="cpu", verbose=False)  # warm-up
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        model.predict(frame, imgsz=IMGSZ, device="cpu", verbose=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies))
+
+
+def evaluate(variants, images):
+    report = {}
+    for name, path in variants.items():
+        try:
+            model = YOLO(str(path), task="detect")
+            metrics = model.val(data=DATA, imgsz=IMGSZ, batch=1, device="cpu", plots=False, verbose=False)
+            report[name] = {
+                "path": str(path),
+                "mAP50": round(float(metrics.box.map50), 4),
+                "mAP50-95": round(float(metrics.box.map), 4),
+                "cpu_latency_ms": round(cpu_latency_ms(model, images), 1),
+            }
+            print(f"{name:14s} mAP50-95 {report[name]['mAP50-95']:.4f} | "
+                  f"CPU {report[name]['cpu_latency_ms']:.1f} ms")
+        except Exception as e:
+            print(f"WARNING: {name} evaluation failed: {e}")
+    return report
+
+
+def pick_deployment(report, max_map_drop):
+    """Biến thể nhanh nhất mà mAP50-95 không giảm quá max_map_drop so với torch-fp32"""
+    baseline = report.get("torch-fp32", {}).get("mAP50-95")
+    if baseline is None:
+        return None
+    accurate = [n for n, r in report.items() if baseline - r["mAP50-95"] <= max_map_drop]
+    return min(accurate, key=lambda n: report[n]["cpu_latency_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train + export + quantize the bag detector")
+    parser.add_argument("--skip-train", action="store_true")
+    parser.add_argument("--weights", default="runs/detect/ice_tracker/weights/best.pt")
+    parser.add_argument("--calib-fraction", type=float, default=0.25,
+                        help="fraction of the train split used for INT8 calibration")
+    parser.add_argument("--max-map-drop", type=float, default=0.01,
+                        help="max mAP50-95 loss accepted for the recommended variant")
+    args = parser.parse_args()
+
+    best = Path(args.weights) if args.skip_train else train()
+    variants, images = export_variants(best, args.calib_fraction)
+    report = evaluate(variants, images)
+    recommended = pick_deployment(report, args.max_map_drop)
+
+    report_path = best.parent / "export_report.json"
+    report_path.write_text(json.dumps({"variants": report, "recommended": recommended}, indent=2))
+    print(f"Report: {report_path}")
+    if recommended:
+        print(f"Recommended for bag_counter: {recommended} -> {report[recommended]['path']}")
+        print(f"  (set BAG_MODEL_PATH={report[recommended]['path']})")
+
 
-# Train với dataset từ Roboflow
-results = model.train(
-    data="data/smartIceTracker-1/data.yaml",
-    epochs=50,        # số vòng lặp
-    imgsz=640,        # kích thước ảnh
-    batch=16,         # batch size
-    name="ice_tracker"
-)
+if __name__ == "__main__":
+    main()